@@ -24,47 +24,52 @@ Usage:
 
 import os
 import re
+from multiprocessing import Pool
 from pathlib import Path
 
+import numpy as np
+
 
 ROOT_DIR = "quantum_docking_result"  # Root folder with one subfolder per pdb_id
 SUMMARY_FILENAME = "summary.txt"     # Name of the summary file to write
+FINAL_TAG = "#FINAL"                 # Prefix of the machine-readable last line read by summary.py
 
 
 # Pattern to match lines of the form:
 #   mode_number   affinity_value   rmsd_lb   rmsd_ub
-MODE_PATTERN = re.compile(r"^\s*(\d+)\s+([\-0-9\.]+)\s+([\-0-9\.]+)\s+([\-0-9\.]+)")
+# (bytes and multiline, so it can be applied to the whole undecoded log at once)
+MODE_PATTERN = re.compile(rb"^[ \t]*\d+[ \t]+([\-0-9\.]+)[ \t]+([\-0-9\.]+)[ \t]+([\-0-9\.]+)", re.MULTILINE)
 
 
 def parse_docking_log(log_file_path):
     """
     Parse a docking log file and compute the average affinity, lower RMSD, and upper RMSD.
+    The raw bytes are scanned with one MODE_PATTERN.findall pass (no text decoding) and the
+    (modes, 3) table is averaged column-wise; rows with a malformed number are skipped.
     Return a tuple (affinity_mean, rmsd_lb_mean, rmsd_ub_mean) or (None, None, None) if no data.
     """
-    total_aff, total_lb, total_ub = 0.0, 0.0, 0.0
-    count = 0
-
     if not log_file_path.is_file():
         return (None, None, None)
 
-    with log_file_path.open('r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            match = MODE_PATTERN.match(line)
-            if not match:
-                continue
-            _, aff_str, lb_str, ub_str = match.groups()
+    rows = MODE_PATTERN.findall(log_file_path.read_bytes())
+    if not rows:
+        return (None, None, None)
+    try:
+        modes = np.array(rows, dtype=np.bytes_).astype(np.float64)
+    except ValueError:
+        # A malformed row (e.g. a truncated line such as "1  -7.-"): convert row by row
+        # and skip only the bad rows, as the line-by-line parser did
+        modes = []
+        for row in rows:
             try:
-                total_aff += float(aff_str)
-                total_lb += float(lb_str)
-                total_ub += float(ub_str)
-                count += 1
+                modes.append([float(value) for value in row])
             except ValueError:
                 continue
-
-    if count == 0:
-        return (None, None, None)
-    return (total_aff / count, total_lb / count, total_ub / count)
+        if not modes:
+            return (None, None, None)
+        modes = np.array(modes)
+    aff, lb, ub = modes.mean(axis=0).tolist()
+    return (aff, lb, ub)
 
 
 def compute_summary(protein_folder):
@@ -88,15 +93,8 @@ def compute_summary(protein_folder):
     if not per_run_results:
         return None
 
-    # compute overall averages
-    total_aff = sum(r[1][0] for r in per_run_results)
-    total_lb  = sum(r[1][1] for r in per_run_results)
-    total_ub  = sum(r[1][2] for r in per_run_results)
-    n = len(per_run_results)
-
-    final_aff = total_aff / n
-    final_lb  = total_lb  / n
-    final_ub  = total_ub  / n
+    # compute overall averages over the (runs, 3) table of per-run means
+    final_aff, final_lb, final_ub = np.array([r[1] for r in per_run_results]).mean(axis=0).tolist()
 
     return {
         'per_run': per_run_results,
@@ -107,6 +105,8 @@ def compute_summary(protein_folder):
 def write_summary(protein_folder, summary_data):
     """
     Write the summary.txt file in the protein_folder based on summary_data.
+    The last line is always '#FINAL<TAB>affinity<TAB>rmsd_lb<TAB>rmsd_ub' so summary.py
+    can read the final averages from the file tail.
     """
     summary_path = protein_folder / SUMMARY_FILENAME
     with summary_path.open('w', encoding='utf-8') as f:
@@ -116,6 +116,19 @@ def write_summary(protein_folder, summary_data):
         aff_f, lb_f, ub_f = summary_data['final']
         f.write(f"\n# Final average over {len(summary_data['per_run'])} runs\n")
         f.write(f"affinity={aff_f:.3f}, rmsd_lb={lb_f:.3f}, rmsd_ub={ub_f:.3f}\n")
+        f.write(f"{FINAL_TAG}\t{aff_f:.6f}\t{lb_f:.6f}\t{ub_f:.6f}\n")
+
+
+def process_protein(protein_folder):
+    """
+    Compute and write the summary for one protein folder.
+    Return (pdb_id, written) where written is False if no valid run data was found.
+    """
+    summary = compute_summary(protein_folder)
+    if summary is None:
+        return protein_folder.name, False
+    write_summary(protein_folder, summary)
+    return protein_folder.name, True
 
 
 def main():
@@ -125,15 +138,14 @@ def main():
         return
 
     print(f"Scanning protein folders in '{ROOT_DIR}'...")
-    for item in sorted(root.iterdir()):
-        if not item.is_dir():
-            continue
-        summary = compute_summary(item)
-        if summary is None:
-            print(f"Warning: No valid run data for {item.name}")
-            continue
-        write_summary(item, summary)
-        print(f"Summary written for {item.name}")
+    protein_folders = [item for item in sorted(root.iterdir()) if item.is_dir()]
+    # Protein folders are independent, so summarize them in parallel
+    with Pool(os.cpu_count()) as pool:
+        for name, written in pool.imap_unordered(process_protein, protein_folders, chunksize=8):
+            if not written:
+                print(f"Warning: No valid run data for {name}")
+                continue
+            print(f"Summary written for {name}")
 
     print("All summaries generated.")
 
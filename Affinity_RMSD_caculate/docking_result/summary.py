@@ -7,14 +7,14 @@
 """
 Generate a consolidated docking summary report by reading the final average
 values from each protein's summary.txt file. Assumes each protein has its
-own subdirectory under ROOT_DIR containing a summary.txt with a final average line.
+own subdirectory under ROOT_DIR containing a summary.txt whose last line is the
+'#FINAL<TAB>affinity<TAB>rmsd_lb<TAB>rmsd_ub' record written by get_average_q.py.
 
 - ROOT_DIR: folder containing one subdirectory per pdb_id
 - SUMMARY_FILENAME: name of the per-protein summary file
 - OUTPUT_SUMMARY_FILE: path to write the combined report
 """
 import os
-import re
 from pathlib import Path
 
 # Configuration
@@ -24,39 +24,33 @@ OUTPUT_SUMMARY_FILE = os.path.join(
     "..", "results", "with_af3", "result_summary", "docking_summary_q.txt"
 )  # File for the combined report
 
-# Regex to extract final average values from a summary line
-FINAL_PATTERN = re.compile(
-    r"affinity\s*=\s*([\-\d\.]+).*rmsd_l\.b\.=\s*([\-\d\.]+).*rmsd_u\.b\.=\s*([\-\d\.]+)",
-    re.IGNORECASE
-)
+FINAL_TAG = b"#FINAL"  # Prefix of the final-average line written by get_average_q.py
+TAIL_BYTES = 128       # Enough of the file end to hold the complete #FINAL line
 
 
 def parse_final_average(summary_path):
     """
     Read a summary.txt and return a tuple (affinity, rmsd_lb, rmsd_ub).
-    Expects a line starting with '[FINAL AVERAGE ACROSS' followed by a
-    line matching the FINAL_PATTERN. Returns (None, None, None) if not found.
+    Only the last TAIL_BYTES of the file are read: its last line must be
+    '#FINAL<TAB>affinity<TAB>rmsd_lb<TAB>rmsd_ub'. Returns (None, None, None) if not found.
     """
     if not summary_path.is_file():
         return (None, None, None)
 
-    found_final = False
-    with summary_path.open('r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if found_final:
-                match = FINAL_PATTERN.search(line)
-                if match:
-                    try:
-                        aff = float(match.group(1))
-                        lb  = float(match.group(2))
-                        ub  = float(match.group(3))
-                        return (aff, lb, ub)
-                    except ValueError:
-                        return (None, None, None)
-            if line.startswith('[FINAL AVERAGE ACROSS'):
-                found_final = True
-    return (None, None, None)
+    with summary_path.open('rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - TAIL_BYTES))
+        lines = f.read().splitlines()
+    if not lines or not lines[-1].startswith(FINAL_TAG):
+        return (None, None, None)
+    fields = lines[-1].split(b"\t")
+    if len(fields) != 4:
+        return (None, None, None)
+    try:
+        aff, lb, ub = (float(x) for x in fields[1:])
+    except ValueError:
+        return (None, None, None)
+    return (aff, lb, ub)
 
 
 def gather_summaries(root_dir):
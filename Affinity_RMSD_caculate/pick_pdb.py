@@ -7,8 +7,8 @@
 """
 This script creates a benchmark dataset by copying per-protein PDB files
 into a standardized folder structure. It uses an index file to select
-which pdb_ids to include and searches recursively in the source folder
-for each "{pdb_id}_full_model_translated.pdb" file.
+which pdb_ids to include and indexes every "{pdb_id}_full_model_translated.pdb"
+file under the source folder in a single recursive walk.
 
 Assumptions:
   - index_group.txt lists pdb_ids under [Group S/M/L] sections.
@@ -22,11 +22,17 @@ Usage:
 import os
 import re
 import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
 INDEX_FILE = "index_group.txt"       # File listing pdb_ids under [Group S/M/L]
 SOURCE_FOLDER = "grouped_prediction_result"  # Root folder to search for PDBs
 BENCHMARK_FOLDER = "QDockbank" # Destination for cleaned PDBs
+PDB_SUFFIX = "_full_model_translated.pdb"  # File name suffix after the pdb_id
+SKIP_DIRS = {"__pycache__", "node_modules"}  # Never searched, like hidden (dot) directories
+
+# Section header of the index file, e.g. "[Group S]"
+GROUP_PATTERN = re.compile(r'^\[Group\s+([SML])\]')
 
 
 def parse_group_index(index_file):
@@ -40,10 +46,12 @@ def parse_group_index(index_file):
             s = line.strip()
             if not s:
                 continue
-            g = re.match(r'^\[Group\s+([SML])\]', s)
-            if g:
-                current_group = g.group(1)
-                continue
+            # Cheap prefix test first: only section headers go through the regex
+            if s.startswith("[Group"):
+                g = GROUP_PATTERN.match(s)
+                if g:
+                    current_group = g.group(1)
+                    continue
             if current_group in {"S","M","L"}:
                 if s.startswith("length_"):
                     continue
@@ -51,16 +59,44 @@ def parse_group_index(index_file):
     return pdb_set
 
 
-def find_pdb_file(pdb_id, root_folder):
+def _scan_pdb_files(folder, targets):
     """
-    Recursively search for "{pdb_id}_full_model_translated.pdb" under root_folder.
-    Returns the full path if found, else None.
+    Recursively yield (file name, path) for every file under folder whose name is in targets.
+    Uses os.scandir, whose DirEntry type checks come from the directory listing itself,
+    so no extra stat call is made per entry. Symlinked, hidden (e.g. .git), SKIP_DIRS and
+    unreadable directories are not descended into.
+    Like os.walk (top-down), a folder's own files are yielded before any of its
+    subfolders are visited, so "first file found" means the same as with os.walk.
     """
-    target = f"{pdb_id}_full_model_translated.pdb"
-    for dirpath, _, filenames in os.walk(root_folder):
-        if target in filenames:
-            return os.path.join(dirpath, target)
-    return None
+    subdirs = []
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith(".") and entry.name not in SKIP_DIRS:
+                        subdirs.append(entry.path)
+                elif entry.name in targets and entry.is_file():
+                    yield entry.name, entry.path
+    except PermissionError:
+        return
+    for subdir in subdirs:
+        yield from _scan_pdb_files(subdir, targets)
+
+
+def build_index(root_folder, pdb_ids):
+    """
+    Scan root_folder once and map each of the wanted pdb_ids to the full path of its
+    "{pdb_id}_full_model_translated.pdb" file (the first one found wins).
+    File names are matched against the exact wanted names with a set lookup, and the
+    scan stops as soon as every pdb_id has been found.
+    """
+    targets = {f"{pdb_id}{PDB_SUFFIX}" for pdb_id in pdb_ids}
+    index = {}
+    for name, path in _scan_pdb_files(root_folder, targets):
+        index.setdefault(name[:-len(PDB_SUFFIX)], path)
+        if len(index) == len(targets):
+            break
+    return index
 
 
 def main():
@@ -68,21 +104,43 @@ def main():
     print(f"Found {len(pdb_set)} pdb_ids in '{INDEX_FILE}'")
 
     os.makedirs(BENCHMARK_FOLDER, exist_ok=True)
-    copied = 0
 
-    for pdb_id in sorted(pdb_set):
-        path = find_pdb_file(pdb_id, SOURCE_FOLDER)
+    # One traversal of the source tree instead of one per pdb_id
+    pdb_index = build_index(SOURCE_FOLDER, pdb_set)
+    copies = []  # (source path, destination file)
+    missing = []
+    # Destination folders left by earlier runs, listed once so only new ones are created
+    with os.scandir(BENCHMARK_FOLDER) as it:
+        existing_dirs = {entry.name for entry in it if entry.is_dir()}
+    # Order does not matter for the copies themselves; only the log lines are sorted
+    for pdb_id in pdb_set:
+        path = pdb_index.get(pdb_id)
         if not path:
-            print(f"Warning: PDB file for {pdb_id} not found")
+            missing.append(pdb_id)
             continue
 
+        # Destination folders are created here, before the copies run in parallel;
+        # the parent exists, so a single mkdir is enough
         dest_dir = os.path.join(BENCHMARK_FOLDER, pdb_id)
-        os.makedirs(dest_dir, exist_ok=True)
-        dest_file = os.path.join(dest_dir, f"{pdb_id}.pdb")
-
-        shutil.copy2(path, dest_file)
+        if pdb_id not in existing_dirs:
+            os.mkdir(dest_dir)
+        copies.append((path, os.path.join(dest_dir, f"{pdb_id}.pdb")))
+
+    for pdb_id in sorted(missing):
+        print(f"Warning: PDB file for {pdb_id} not found")
+
+    # Copying is I/O-bound (the threads release the GIL in the read/write syscalls)
+    done = []
+    with ThreadPoolExecutor(max_workers=16) as ex:
+        futures = {ex.submit(shutil.copy2, path, dest_file): (path, dest_file) for path, dest_file in copies}
+        for future in as_completed(futures):
+            future.result()
+            done.append(futures[future])
+
+    done.sort(key=lambda item: item[1])
+    for path, dest_file in done:
         print(f"Copied {path} → {dest_file}")
-        copied += 1
+    copied = len(done)
 
     print(f"\nDone: {copied} files copied into '{BENCHMARK_FOLDER}'")
 
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Quaternion characteristic polynomial (QCP) RMSD, after Theobald (2005) and
+Liu, Agrafiotis & Theobald (2010).
+
+The minimal RMSD between two coordinate sets is obtained in closed form from the
+largest eigenvalue of the 4x4 quaternion key matrix, found by Newton iteration on
+its characteristic polynomial. No SVD and no rotation matrix are needed, which makes
+it much cheaper than Kabsch for the short CA segments handled here.
+When numba is installed the kernels are JIT-compiled (nopython mode, cached on disk).
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the kernels then run as plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+EVAL_PREC = 1e-11   # Relative precision of the largest eigenvalue
+MAX_ITER = 50       # Newton iterations before giving up on further refinement
+
+
+@njit(cache=True)
+def inner_product(P, Q):
+    """
+    Given two centered (N, 3) coordinate arrays, return (A, E0) where A is the 3x3
+    inner-product matrix A[i, j] = sum(P[:, i] * Q[:, j]) and E0 = (|P|^2 + |Q|^2) / 2.
+    """
+    A = np.zeros((3, 3))
+    G1 = 0.0
+    G2 = 0.0
+    for k in range(P.shape[0]):
+        for i in range(3):
+            G1 += P[k, i] * P[k, i]
+            G2 += Q[k, i] * Q[k, i]
+            for j in range(3):
+                A[i, j] += P[k, i] * Q[k, j]
+    return A, 0.5 * (G1 + G2)
+
+
+@njit(cache=True)
+def fast_calc_rmsd(A, E0, n):
+    """
+    Return the minimal RMSD for the inner-product matrix A, the value E0 and
+    the number of atoms n (FastCalcRMSDAndRotation without the rotation step).
+    """
+    Sxx, Sxy, Sxz = A[0, 0], A[0, 1], A[0, 2]
+    Syx, Syy, Syz = A[1, 0], A[1, 1], A[1, 2]
+    Szx, Szy, Szz = A[2, 0], A[2, 1], A[2, 2]
+
+    Sxx2, Syy2, Szz2 = Sxx * Sxx, Syy * Syy, Szz * Szz
+    Sxy2, Syz2, Sxz2 = Sxy * Sxy, Syz * Syz, Sxz * Sxz
+    Syx2, Szy2, Szx2 = Syx * Syx, Szy * Szy, Szx * Szx
+
+    SyzSzymSyySzz2 = 2.0 * (Syz * Szy - Syy * Szz)
+    Sxx2Syy2Szz2Syz2Szy2 = Syy2 + Szz2 - Sxx2 + Syz2 + Szy2
+
+    C2 = -2.0 * (Sxx2 + Syy2 + Szz2 + Sxy2 + Syx2 + Sxz2 + Szx2 + Syz2 + Szy2)
+    C1 = 8.0 * (Sxx * Syz * Szy + Syy * Szx * Sxz + Szz * Sxy * Syx
+                - Sxx * Syy * Szz - Syz * Szx * Sxy - Szy * Syx * Sxz)
+
+    SxzpSzx, SyzpSzy, SxypSyx = Sxz + Szx, Syz + Szy, Sxy + Syx
+    SyzmSzy, SxzmSzx, SxymSyx = Syz - Szy, Sxz - Szx, Sxy - Syx
+    SxxpSyy, SxxmSyy = Sxx + Syy, Sxx - Syy
+    Sxy2Sxz2Syx2Szx2 = Sxy2 + Sxz2 - Syx2 - Szx2
+
+    C0 = (Sxy2Sxz2Syx2Szx2 * Sxy2Sxz2Syx2Szx2
+          + (Sxx2Syy2Szz2Syz2Szy2 + SyzSzymSyySzz2) * (Sxx2Syy2Szz2Syz2Szy2 - SyzSzymSyySzz2)
+          + (-SxzpSzx * SyzmSzy + SxymSyx * (SxxmSyy - Szz)) * (-SxzmSzx * SyzpSzy + SxymSyx * (SxxmSyy + Szz))
+          + (-SxzpSzx * SyzpSzy - SxypSyx * (SxxpSyy - Szz)) * (-SxzmSzx * SyzmSzy - SxypSyx * (SxxpSyy + Szz))
+          + (SxypSyx * SyzpSzy + SxzpSzx * (SxxmSyy + Szz)) * (-SxymSyx * SyzmSzy + SxzpSzx * (SxxpSyy + Szz))
+          + (SxypSyx * SyzmSzy + SxzmSzx * (SxxmSyy - Szz)) * (-SxymSyx * SyzpSzy + SxzmSzx * (SxxpSyy - Szz)))
+
+    # Newton-Raphson for the largest root, starting from the upper bound E0
+    mx_eigenv = E0
+    for _ in range(MAX_ITER):
+        old_g = mx_eigenv
+        x2 = mx_eigenv * mx_eigenv
+        b = (x2 + C2) * mx_eigenv
+        a = b + C1
+        denom = 2.0 * x2 * mx_eigenv + b + a
+        if denom == 0.0:
+            break
+        mx_eigenv -= (a * mx_eigenv + C0) / denom
+        if abs(mx_eigenv - old_g) < abs(EVAL_PREC * mx_eigenv):
+            break
+
+    return math.sqrt(abs(2.0 * (E0 - mx_eigenv) / n))
+
+
+@njit(cache=True)
+def _qcp_rmsd_kernel(P, Q):
+    """Center two float64 (N, 3) arrays and return their QCP RMSD."""
+    n = P.shape[0]
+    Pc = P - P.sum(axis=0) / n
+    Qc = Q - Q.sum(axis=0) / n
+    A, E0 = inner_product(Pc, Qc)
+    return fast_calc_rmsd(A, E0, n)
+
+
+@njit(cache=True)
+def _fast_calc_rmsd_batch(A, E0, n):
+    """Run fast_calc_rmsd on every (A[b], E0[b], n[b]) of a batch."""
+    rmsds = np.empty(A.shape[0])
+    for b in range(A.shape[0]):
+        rmsds[b] = fast_calc_rmsd(A[b], E0[b], n[b])
+    return rmsds
+
+
+def qcp_rmsd(P, Q):
+    """
+    Return the RMSD between two (N, 3) coordinate arrays after optimal superposition.
+    """
+    P = np.ascontiguousarray(P, dtype=np.float64)
+    Q = np.ascontiguousarray(Q, dtype=np.float64)
+    return float(_qcp_rmsd_kernel(P, Q))
+
+
+def qcp_rmsd_batch(P_list, Q_list):
+    """
+    Return the RMSDs after optimal superposition of many coordinate pairs at once.
+    P_list[b] and Q_list[b] are (N_b, 3) arrays; N_b may differ between pairs but must be > 0.
+    The pairs are zero-padded into (B, N_max, 3) stacks, so the centering, the B inner-product
+    matrices and E0 values each come from one vectorized NumPy call; the Newton step then
+    runs over the whole batch in a single kernel call.
+    Returns a float64 array of B RMSDs.
+    """
+    n = np.array([len(p) for p in P_list], dtype=np.int64)
+    if len(n) == 0:
+        return np.empty(0)
+    mask = (np.arange(n.max()) < n[:, None])[:, :, None]
+    P = np.zeros((len(n), n.max(), 3))
+    Q = np.zeros_like(P)
+    for b, (p, q) in enumerate(zip(P_list, Q_list)):
+        P[b, :n[b]] = p
+        Q[b, :n[b]] = q
+    # Padding rows are zero, so the sums are exact; re-zero them after centering
+    P = (P - (P.sum(axis=1) / n[:, None])[:, None, :]) * mask
+    Q = (Q - (Q.sum(axis=1) / n[:, None])[:, None, :]) * mask
+    A = np.einsum("bki,bkj->bij", P, Q)
+    E0 = 0.5 * (np.einsum("bki,bki->b", P, P) + np.einsum("bki,bki->b", Q, Q))
+    return _fast_calc_rmsd_batch(A, E0, n)
+
+
+# Compile (or load from the numba cache) at import time so the first protein
+# does not pay the JIT warm-up
+_qcp_rmsd_kernel(np.zeros((2, 3)), np.ones((2, 3)))
+_fast_calc_rmsd_batch(np.zeros((1, 3, 3)), np.zeros(1), np.ones(1, dtype=np.int64))
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared parsing and RMSD code for RMSD_Q.py (quantum top segments) and RMSD_af.py (AF2).
+
+Both drivers build a task table with one row per protein (pdb_id, chain_id, start_res,
+end_res, pred_name) and hand it to locate_files() and run_rmsd():
+  - the predicted pdbqt is assumed to have CA atoms numbered from 0,
+  - the real structure {pdb_id}/{pdb_id}_protein.pdb uses actual residue numbering,
+  - the two CA sets are superimposed with the QCP method (qcprot.py) to compute RMSD,
+  - results are written as "pdb_id<TAB>RMSD", or "pdb_id<TAB>N/A (reason)".
+"""
+
+import mmap
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from qcprot import qcp_rmsd_batch
+
+# ATOM records whose atom name is CA; x/y/z are the fixed-width columns 31-38, 39-46, 47-54
+CA_PATTERN = re.compile(rb'^ATOM.{9}CA .{14}(.{8})(.{8})(.{8})', re.MULTILINE)
+MIN_PDBQT_LINE_BYTES = 50  # Lower bound on the length of a pdbqt ATOM line
+MMAP_MIN_BYTES = 1 << 20    # Files at least this large are memory-mapped instead of read
+
+# Benchmark index lines: pdb_id, "Chain", chain_id, then "Residues start-end".
+# Applied to the whole file at once, so only spaces/tabs may separate the fields.
+INDEX_LINE_PATTERN = re.compile(
+    r"^[ \t]*(?P<pdb_id>(?!\[|length_)\S+)[ \t]+\S+[ \t]+(?P<chain_id>\S+)[ \t]+.*?"
+    r"Residues[ \t]+(?P<start_res>\d+)-(?P<end_res>\d+)",
+    re.IGNORECASE | re.MULTILINE
+)
+INDEX_COLUMNS = ["pdb_id", "chain_id", "start_res", "end_res"]
+
+def parse_top_list(filename):
+    """
+    Parse the file that contains lines in the format:
+      pdb_id    top_name
+    Return a DataFrame with columns (pdb_id, top_name); later lines win for repeated pdb_ids.
+    """
+    top = pd.read_csv(filename, sep=r"\s+", header=None, comment="#", usecols=[0, 1],
+                      names=["pdb_id", "top_name"], dtype=str, engine="c")
+    top = top.dropna()
+    return top.drop_duplicates("pdb_id", keep="last").reset_index(drop=True)
+
+def parse_index_file(index_path):
+    """
+    Parse the benchmark index file, which contains lines like:
+      1e2k  Chain A  Residues 55-60  length=6  DGPHGM
+    Return a DataFrame with columns (pdb_id, chain_id, start_res, end_res).
+    The whole file is scanned with one INDEX_LINE_PATTERN.finditer pass; lines that start
+    with '[' or 'length_' or are blank do not match.
+    """
+    with open(index_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    rows = [(m["pdb_id"], m["chain_id"], int(m["start_res"]), int(m["end_res"]))
+            for m in INDEX_LINE_PATTERN.finditer(text)]
+    index_df = pd.DataFrame(rows, columns=INDEX_COLUMNS)
+    return index_df.drop_duplicates("pdb_id", keep="last").reset_index(drop=True)
+
+def parse_pdbqt(pdbqt_path, length):
+    """
+    Parse a predicted pdbqt file to extract CA atom coordinates for the segment.
+    The predicted structure is assumed to have residues numbered starting from 0.
+    The file is read in one call (memory-mapped only above MMAP_MIN_BYTES) and scanned once
+    with CA_PATTERN; x/y/z are taken from the fixed PDB columns 31-54 and only the first
+    'length' CA atoms are kept.
+    Returns an (N, 3) float64 numpy array.
+    """
+    with open(pdbqt_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return np.empty((0, 3), dtype=np.float64)
+        if size < MMAP_MIN_BYTES:
+            # A typical pdbqt is a few hundred KB: one read() beats mapping it page by page
+            fields = [m.groups() for m in islice(CA_PATTERN.finditer(f.read()), length)]
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                fields = [m.groups() for m in islice(CA_PATTERN.finditer(mm), length)]
+    if not fields:
+        return np.empty((0, 3), dtype=np.float64)
+    return np.array(fields, dtype="S8").astype(np.float64)
+
+@lru_cache(maxsize=256)
+def parse_real_pdb(pdb_path, chain_id, start_res, end_res):
+    """
+    Extract CA atom coordinates of the real PDB structure from the specified chain
+    within the residue range [start_res, end_res].
+    The file is memory-mapped and ATOM/HETATM records are read by their fixed PDB
+    columns (atom name 13-16, chain 22, resSeq 23-26, x/y/z 31-54) instead of building
+    a Bio.PDB structure. Only the first model and the first alternate location of each
+    CA are used, and the scan stops at the first CA of the chain past end_res;
+    results are cached per (pdb_path, chain_id, start_res, end_res).
+    Returns a read-only (N, 3) float64 numpy array.
+    """
+    chain = chain_id.encode()
+    # Pre-allocated for the expected segment; grown only if insertion codes add residues
+    coords = np.empty((max(end_res - start_res + 1, 1), 3), dtype=np.float64)
+    n = 0
+    last_res = None
+    with open(pdb_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            coords = coords[:0]
+            coords.flags.writeable = False
+            return coords
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            start = 0
+            while start < size:
+                end = mm.find(b"\n", start)
+                if end == -1:
+                    end = size
+                # Rejected lines (REMARK, CONECT, TER, ...) cost a single slice compare
+                record = mm[start:start + 6]
+                if record == b"ENDMDL":
+                    break
+                if ((record == b"ATOM  " or record == b"HETATM") and end - start >= 54
+                        and mm[start + 12:start + 16] == b" CA " and mm[start + 21:start + 22] == chain):
+                    res_key = mm[start + 22:start + 27]  # resSeq + insertion code
+                    if res_key != last_res:
+                        last_res = res_key
+                        res_id = int(mm[start + 22:start + 26])
+                        # Residues are ordered within a chain: nothing after this belongs to the segment
+                        if res_id > end_res:
+                            break
+                        if res_id >= start_res:
+                            if n == len(coords):
+                                coords = np.vstack((coords, np.empty_like(coords)))
+                            coords[n, 0] = float(mm[start + 30:start + 38])
+                            coords[n, 1] = float(mm[start + 38:start + 46])
+                            coords[n, 2] = float(mm[start + 46:start + 54])
+                            n += 1
+                start = end + 1
+    # The array is shared through lru_cache, so hand it out read-only
+    coords = coords[:n]
+    coords.flags.writeable = False
+    return coords
+
+def compute_rmsds(segments):
+    """
+    Return the RMSD after optimal superposition of each (pred_coords, real_coords) pair,
+    or None where the sizes differ or are empty.
+    All valid pairs go through a single batched QCP call (qcprot.qcp_rmsd_batch).
+    """
+    rmsds = [None] * len(segments)
+    valid = [i for i, (pred, real) in enumerate(segments) if len(pred) == len(real) and len(pred) > 0]
+    batch = qcp_rmsd_batch([segments[i][1] for i in valid], [segments[i][0] for i in valid])
+    for i, rmsd_val in zip(valid, batch.tolist()):
+        rmsds[i] = rmsd_val
+    return rmsds
+
+def load_segment_coords(task):
+    """
+    Parse the predicted and real CA coordinates of one protein's segment.
+    task is a row of the table completed by locate_files() (pdb_id, chain_id, start_res,
+    end_res, pred_path, pred_size, pred_exists, real_path, real_exists, and optionally
+    in_index).
+    Returns (pdb_id, (pred_coords, real_coords)) on success or (pdb_id, "N/A (reason)") otherwise.
+    """
+    pdb_id = task["pdb_id"]
+    if not task.get("in_index", True):
+        return pdb_id, "N/A (not in benchmark index)"
+    chain_id = task["chain_id"]
+    start_res, end_res = int(task["start_res"]), int(task["end_res"])
+    seg_length = end_res - start_res + 1
+    if seg_length <= 0:
+        return pdb_id, f"N/A (invalid residue range {start_res}-{end_res})"
+
+    pred_path = task["pred_path"]
+    if not task["pred_exists"]:
+        return pdb_id, f"N/A (predicted file not found: {pred_path})"
+    # A CA line is at least MIN_PDBQT_LINE_BYTES long: a smaller file cannot hold the segment
+    if task["pred_size"] < seg_length * MIN_PDBQT_LINE_BYTES:
+        return pdb_id, f"N/A (predicted file too small: {task['pred_size']} bytes for {seg_length} CA atoms)"
+
+    real_path = task["real_path"]
+    if not task["real_exists"]:
+        return pdb_id, f"N/A (real file not found: {real_path})"
+
+    # Parse predicted CA coordinates (using relative numbering: [0 .. seg_length-1])
+    pred_coords = parse_pdbqt(pred_path, seg_length)
+    # The pdbqt is the cheaper file: only parse the real structure if it yielded the full segment
+    if len(pred_coords) != seg_length:
+        return pdb_id, f"N/A (atom count mismatch: pred={len(pred_coords)}, expected={seg_length})"
+    # Parse real CA coordinates (using actual numbering: [start_res .. end_res])
+    real_coords = parse_real_pdb(real_path, chain_id, start_res, end_res)
+
+    if len(pred_coords) != len(real_coords) or len(pred_coords) == 0:
+        return pdb_id, f"N/A (atom count mismatch: pred={len(pred_coords)}, real={len(real_coords)})"
+    return pdb_id, (pred_coords, real_coords)
+
+def load_coord_cache(cache_file):
+    """
+    Load the segment coordinates stored by save_coord_cache().
+    Returns {pdb_id: (pred_coords, real_coords)}, empty if cache_file does not exist yet.
+    """
+    if not os.path.isfile(cache_file):
+        return {}
+    with np.load(cache_file) as npz:
+        return {key[:-2]: (npz[key], npz[key[:-2] + "_r"]) for key in npz.files if key.endswith("_p")}
+
+def save_coord_cache(cache_file, coords):
+    """
+    Write {pdb_id: (pred_coords, real_coords)} to cache_file as a single uncompressed .npz
+    holding the arrays {pdb_id}_p and {pdb_id}_r, so later runs skip all text parsing.
+    """
+    arrays = {}
+    for pdb_id, (pred_coords, real_coords) in coords.items():
+        arrays[pdb_id + "_p"] = pred_coords
+        arrays[pdb_id + "_r"] = real_coords
+    np.savez(cache_file, **arrays)
+
+def scan_struct_dir(root):
+    """
+    List root and each of its {pdb_id} subfolders once with os.scandir.
+    Returns {pdb_id: {file name: os.DirEntry}} for the regular files found, so existence
+    checks become dict lookups instead of one stat call per path.
+    """
+    try:
+        with os.scandir(root) as it:
+            subdirs = [d for d in it if d.is_dir()]
+    except FileNotFoundError:
+        return {}
+
+    def list_files(subdir):
+        with os.scandir(subdir.path) as it:
+            return subdir.name, {e.name: e for e in it if e.is_file()}
+
+    # Listing a directory is I/O-bound, so overlap the listings across threads
+    with ThreadPoolExecutor(max_workers=16) as ex:
+        return dict(ex.map(list_files, subdirs))
+
+def locate_files(tasks, pred_dir, real_dir):
+    """
+    Add the predicted and real file paths to the task table and check their existence
+    against one scan_struct_dir() listing of each structure directory.
+    The predicted file is {pred_dir}/{pdb_id}/{pred_name}; the real structure is
+    {real_dir}/{pdb_id}/{pdb_id}_protein.pdb.
+    Returns a list of per-protein task dicts for load_segment_coords().
+    """
+    tasks["pred_path"] = pred_dir + os.sep + tasks["pdb_id"] + os.sep + tasks["pred_name"]
+    tasks["real_path"] = real_dir + os.sep + tasks["pdb_id"] + os.sep + tasks["pdb_id"] + "_protein.pdb"
+    pred_index = scan_struct_dir(pred_dir)
+    real_index = scan_struct_dir(real_dir)
+    pred_entries = [pred_index.get(pdb_id, {}).get(pred_name)
+                    for pdb_id, pred_name in zip(tasks["pdb_id"], tasks["pred_name"])]
+    # Only predicted files that exist are stat'ed, for the size check in load_segment_coords()
+    tasks["pred_size"] = [entry.stat().st_size if entry is not None else -1 for entry in pred_entries]
+    tasks["real_exists"] = [pdb_id + "_protein.pdb" in real_index.get(pdb_id, ())
+                            for pdb_id in tasks["pdb_id"]]
+    tasks["pred_exists"] = tasks["pred_size"] >= 0
+    return tasks.to_dict(orient="records")
+
+def run_rmsd(tasks, output_file, header, cache_file=None):
+    """
+    Parse the CA segments of every task in parallel, compute their RMSDs and write
+    'pdb_id<TAB>RMSD_value' lines, sorted by pdb_id, to output_file after the header line.
+    If cache_file (a .npz path) is given, segments stored there by an earlier run are reused
+    instead of parsed, and the file is rewritten when new segments were parsed. Delete it
+    whenever the index, top list or structure files change.
+    Returns the sorted list of (pdb_id, result) pairs.
+    """
+    coords = load_coord_cache(cache_file) if cache_file else {}
+    todo = [task for task in tasks if task["pdb_id"] not in coords]
+    n_cached = len(coords)
+
+    # Proteins are independent, so they are parsed in parallel; results arrive out of order
+    results = []
+    with Pool(os.cpu_count()) as pool:
+        for pdb_id, segment in pool.imap_unordered(load_segment_coords, todo, chunksize=8):
+            if isinstance(segment, str):
+                results.append((pdb_id, segment))
+            else:
+                coords[pdb_id] = segment
+    if cache_file and len(coords) > n_cached:
+        save_coord_cache(cache_file, coords)
+
+    # Compute all RMSDs after optimal superposition in one batch (the cache may hold proteins not in tasks)
+    pdb_ids = list({task["pdb_id"] for task in tasks}.intersection(coords))
+    for pdb_id, rmsd_val in zip(pdb_ids, compute_rmsds([coords[pdb_id] for pdb_id in pdb_ids])):
+        if rmsd_val is None:
+            results.append((pdb_id, "N/A (cannot compute RMSD)"))
+            continue
+        results.append((pdb_id, rmsd_val))
+        print(f"{pdb_id} => RMSD={rmsd_val:.3f}")
+
+    # Sort once and write everything in a single buffered call
+    results.sort(key=lambda r: r[0])
+    lines = [f"{pdb_id}\t{result}\n" if isinstance(result, str) else f"{pdb_id}\t{result:.3f}\n"
+             for pdb_id, result in results]
+    with open(output_file, "w", encoding="utf-8", buffering=1 << 20) as outf:
+        outf.write(header + "\n\n")
+        outf.write("".join(lines))
+    return results
@@ -6,7 +6,7 @@
 
 
 """
-Split a single metadata TXT file into per‐protein JSON files.
+Split a single metadata TXT file into per‐protein (compact) JSON files.
 
 Each JSON will have two top‐level keys:
   - "protein_information": { "pdb_id", "sequence", "sequence_length", "residues" }
@@ -19,9 +19,16 @@ Assumes:
   - There is a parent dataset directory containing one subfolder per pdb_id.
 """
 
+import csv
+import math
 import os
 import json
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib json module is used instead
+    orjson = None
 
 # Path to the metadata TXT file
 METADATA_FILE = "dataset_info/benchmark_info.txt"
@@ -29,27 +36,56 @@ METADATA_FILE = "dataset_info/benchmark_info.txt"
 # Base directory under which each pdb_id has its own subfolder
 BASE_DIR = "QDockBank"
 
+def float_or_none(value):
+    """
+    Convert a metadata cell to float; empty, NaN and infinite cells become None (JSON null),
+    so both serializers below write the same value for them.
+    """
+    if not value.strip():
+        return None
+    number = float(value)
+    return number if math.isfinite(number) else None
+
+def write_json(out_path, record):
+    """
+    Write one metadata record to out_path as compact JSON (no indentation or spaces)
+    in a single write call; the parent folder must already exist.
+    Serialized with orjson when installed, else with json; both write raw UTF-8 text and
+    null for missing floats, but may format some floats differently (e.g. 1e-05 vs 0.00001).
+    """
+    if orjson is not None:
+        data = orjson.dumps(record)
+    else:
+        data = json.dumps(record, separators=(",", ":"), ensure_ascii=False, allow_nan=False).encode()
+    with open(out_path, 'wb') as f:
+        f.write(data)
+    return out_path
+
 def main():
-    # Read the metadata table
-    # df = pd.read_csv(METADATA_FILE, sep='\t', dtype=str)
-    df = pd.read_csv(METADATA_FILE, sep='\t', skipinitialspace=True, dtype=str)
-
-    # Clean up column names and map to JSON keys
-    df = df.rename(columns={
-        'pdb_id':             'pdb_id',
-        'Residue_sequence':   'sequence',
-        'Sequence_length':    'sequence_length',
-        'Residues':           'residues',
-        'Number_of_qubits':   'number_of_qubits',
-        'Circuit_Depth':      'circuit_depth',
-        'Lowest_energy':      'lowest_energy',
-        'Highest_energy':     'highest_energy',
-        'Energy_range':       'energy_range',
-        'Execution_Time(s)':  'execution_time_s',
-    })
-
-    # Process each row and write out JSON
-    for _, row in df.iterrows():
+    # Clean up column names and map to JSON keys and value types;
+    # columns not listed here are never copied into the records
+    columns = {
+        'pdb_id':             ('pdb_id', str),
+        'Residue_sequence':   ('sequence', str),
+        'Sequence_length':    ('sequence_length', int),
+        'Residues':           ('residues', str),
+        'Number_of_qubits':   ('number_of_qubits', int),
+        'Circuit_Depth':      ('circuit_depth', int),
+        'Lowest_energy':      ('lowest_energy', float_or_none),
+        'Highest_energy':     ('highest_energy', float_or_none),
+        'Energy_range':       ('energy_range', float_or_none),
+        'Execution_Time(s)':  ('execution_time_s', float_or_none),
+    }
+
+    # Read the metadata table row by row as plain dicts (no DataFrame needed),
+    # converting each value to its type once while the row is read
+    with open(METADATA_FILE, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f, delimiter='\t', skipinitialspace=True)
+        rows = [{key: cast(row[name]) for name, (key, cast) in columns.items()} for row in reader]
+
+    # Build every (out_path, record) pair and create the pdb_id folders up front
+    items = []
+    for row in rows:
         pdb_id = row['pdb_id']
         folder = os.path.join(BASE_DIR, pdb_id)
         os.makedirs(folder, exist_ok=True)
@@ -59,26 +95,27 @@ def main():
             "protein_information": {
                 "pdb_id":          pdb_id,
                 "sequence":        row['sequence'],
-                "sequence_length": int(row['sequence_length']),
+                "sequence_length": row['sequence_length'],
                 "chain": "A",
                 "residues":        row['residues'],
             },
             "quantum_metadata": {
-                "number_of_qubits": int(row['number_of_qubits']),
-                "circuit_depth":    int(row['circuit_depth']),
-                "lowest_energy":    float(row['lowest_energy']),
-                "highest_energy":   float(row['highest_energy']),
-                "energy_range":     float(row['energy_range']),
-                "execution_time_s": float(row['execution_time_s']),
+                "number_of_qubits": row['number_of_qubits'],
+                "circuit_depth":    row['circuit_depth'],
+                "lowest_energy":    row['lowest_energy'],
+                "highest_energy":   row['highest_energy'],
+                "energy_range":     row['energy_range'],
+                "execution_time_s": row['execution_time_s'],
             }
         }
 
-        # Write JSON to {pdb_id}/{pdb_id}_metadata.json
-        out_path = os.path.join(folder, f"{pdb_id}_metadata.json")
-        with open(out_path, 'w') as f:
-            json.dump(record, f, indent=2)
+        # JSON goes to {pdb_id}/{pdb_id}_metadata.json
+        items.append((os.path.join(folder, f"{pdb_id}_metadata.json"), record))
 
-        print(f"Wrote {out_path}")
+    # The files are independent small writes, so overlap them across threads
+    with ThreadPoolExecutor(max_workers=32) as ex:
+        for out_path in ex.map(lambda item: write_json(*item), items):
+            print(f"Wrote {out_path}")
 
 if __name__ == "__main__":
     main()
@@ -3,41 +3,78 @@
 """
 This script reads a protein information file (e.g. "protein_info.txt") where the first
 column is the pdb id. For each pdb id, the script retrieves the corresponding protein title
-from the RCSB PDB REST API and writes the results (pdb id and protein title) into a new file.
+from the RCSB PDB GraphQL API and writes the results (pdb id and protein title) into a new file.
+The titles are requested in batches of GRAPHQL_BATCH_SIZE ids per POST, and titles already
+stored in the on-disk cache (CACHE_FILE) are not requested again.
 """
 
+import json
+import os
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 INFO_FILE = "benchmark_info.txt"  # Input info file containing protein data
 OUTPUT_FILE = "pdb_names.txt"  # Output file for pdb id and protein title pairs
+RCSB_GRAPHQL_URL = "https://data.rcsb.org/graphql"  # RCSB GraphQL endpoint
+GRAPHQL_BATCH_SIZE = 100  # Number of pdb ids looked up per GraphQL request
+CACHE_FILE = "pdb_names.cache.json"  # Titles fetched by earlier runs, keyed by lowercase pdb id
+
+
+# Titles of a list of entries; entries that do not exist are left out of the result
+TITLES_QUERY = "query($ids: [String!]!) { entries(entry_ids: $ids) { rcsb_id struct { title } } }"
 
 
 # ==============================================================
 
-def get_protein_title(pdb_id):
+def make_session():
+    """
+    Create an HTTP session shared by all requests.
+    Rate-limited (429) or server-error (5xx) responses are retried with exponential
+    backoff; the GraphQL POST is a read-only query, so retrying it is safe.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    retry = Retry(total=5, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(["POST"]))
+    adapter = HTTPAdapter(max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_protein_titles(pdb_ids, session=requests):
     """
-    Retrieve the protein title for the given pdb id from the RCSB PDB database.
+    Retrieve the protein titles for a batch of pdb ids from the RCSB PDB database
+    with a single GraphQL request.
 
     Args:
-        pdb_id (str): The PDB ID (case-insensitive).
+        pdb_ids (list): PDB IDs (case-insensitive).
+        session: Session (or the requests module) used to send the request.
 
     Returns:
-        str: The protein title if found, otherwise None.
+        dict: Mapping of each given pdb id to its protein title, or None if not found.
     """
-    base_url = "https://data.rcsb.org/rest/v1/core/entry"
-    pdb_id_lower = pdb_id.lower()  # API expects lowercase pdb id
-    url = f"{base_url}/{pdb_id_lower}"
+    titles = dict.fromkeys(pdb_ids)
     try:
-        response = requests.get(url)
+        response = session.post(RCSB_GRAPHQL_URL,
+                                json={"query": TITLES_QUERY, "variables": {"ids": [p.upper() for p in pdb_ids]}})
         response.raise_for_status()
-        data = response.json()
-        # Protein title is located under "struct" -> "title"
-        title = data.get("struct", {}).get("title", None)
-        return title
-    except requests.exceptions.RequestException as e:
-        print(f"Error retrieving data for pdb id {pdb_id}: {e}")
-        return None
+        entries = (response.json().get("data") or {}).get("entries") or []
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Error retrieving data for pdb ids {pdb_ids[0]}..{pdb_ids[-1]}: {e}")
+        return titles
+
+    # Protein title is located under "struct" -> "title"; rcsb_id is upper case
+    by_id = {entry["rcsb_id"].lower(): (entry.get("struct") or {}).get("title")
+             for entry in entries if entry and entry.get("rcsb_id")}
+    for pdb_id in pdb_ids:
+        titles[pdb_id] = by_id.get(pdb_id.lower())
+    return titles
 
 
 def read_protein_ids(info_file):
@@ -64,6 +101,37 @@ def read_protein_ids(info_file):
     return sorted(protein_ids)
 
 
+def load_title_cache(cache_file):
+    """
+    Load the title cache written by save_title_cache().
+
+    Args:
+        cache_file (str): Path to the JSON cache file.
+
+    Returns:
+        dict: Mapping of lowercase pdb id to protein title (empty if there is no cache yet).
+    """
+    if not os.path.isfile(cache_file):
+        return {}
+    with open(cache_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_title_cache(cache, cache_file):
+    """
+    Atomically replace the title cache file: the JSON is written to a temporary file
+    first, so an interrupted run never leaves a truncated cache behind.
+
+    Args:
+        cache (dict): Mapping of lowercase pdb id to protein title.
+        cache_file (str): Path to the JSON cache file.
+    """
+    tmp_file = cache_file + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp_file, cache_file)
+
+
 def write_protein_titles(protein_titles, output_file):
     """
     Write the protein titles to an output file.
@@ -85,12 +153,24 @@ def main():
     protein_ids = read_protein_ids(INFO_FILE)
     print(f"Found {len(protein_ids)} unique protein ids.")
 
-    # Retrieve protein title for each pdb id.
-    protein_titles = {}
-    for pdb_id in protein_ids:
-        title = get_protein_title(pdb_id)
-        protein_titles[pdb_id] = title
-        print(f"{pdb_id}: {title}")
+    # PDB titles never change, so only ids missing from the cache go to the network.
+    cache = load_title_cache(CACHE_FILE)
+    missing_ids = [pdb_id for pdb_id in protein_ids if pdb_id.lower() not in cache]
+    print(f"{len(protein_ids) - len(missing_ids)} titles loaded from {CACHE_FILE}, fetching {len(missing_ids)}.")
+
+    # One GraphQL request per batch instead of one REST request per pdb id
+    with make_session() as session:
+        for start in range(0, len(missing_ids), GRAPHQL_BATCH_SIZE):
+            titles = get_protein_titles(missing_ids[start:start + GRAPHQL_BATCH_SIZE], session)
+            for pdb_id, title in titles.items():
+                print(f"{pdb_id}: {title}")
+                # Failed lookups are not cached, so they are retried on the next run
+                if title is not None:
+                    cache[pdb_id.lower()] = title
+    if missing_ids:
+        save_title_cache(cache, CACHE_FILE)
+
+    protein_titles = {pdb_id: cache.get(pdb_id.lower()) for pdb_id in protein_ids}
 
     # Write the results to the output file.
     write_protein_titles(protein_titles, OUTPUT_FILE)
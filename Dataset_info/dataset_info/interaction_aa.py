@@ -10,15 +10,17 @@ This script reads a benchmark txt file that contains columns including:
   Cost_max, Cost_range, Execution_Time(s), Circuit_Depth.
 It then extracts the 'Residue_sequence' for each protein fragment and analyzes
 the inter-residue interactions. For each fragment, it considers all pairs (i, j) with i < j.
-If a pair (first_letter + second_letter) or its reverse has been seen before in that fragment,
-it will not be counted again. Finally, the script aggregates the counts of these interactions
-across all fragments and writes the results to an output txt file.
+Each unordered residue pair is counted at most once per fragment and is written in sorted
+letter order (a pair and its reverse are the same interaction). Finally, the script aggregates
+the counts of these interactions across all fragments and writes the results to an output txt file.
 """
 
 import os
 import sys
 from collections import Counter
 
+import numpy as np
+
 
 INPUT_FILE = "benchmark_info.txt"  # Input file containing benchmark data (tab-delimited)
 OUTPUT_FILE = "interactions_summary.txt"  # Output file to save aggregated interactions
@@ -28,77 +30,66 @@ OUTPUT_FILE = "interactions_summary.txt"  # Output file to save aggregated inter
 
 def parse_benchmark_file(filepath):
     """
-    Parse the benchmark file and extract a list of residue sequences.
+    Parse the benchmark file and yield its residue sequences one at a time.
     Assumes the file is tab-delimited with a header. The column "Residue_sequence"
     is expected to be the second column.
+    The file is read line by line, so memory use does not grow with the file size.
 
-    Returns:
-        A list of residue sequences (strings).
+    Yields:
+        Residue sequences (strings).
     """
-    sequences = []
     with open(filepath, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    if not lines:
-        print("Input file is empty.")
-        return sequences
-
-    # Assume first line is header; find index of "Residue_sequence" (case-insensitive)
-    header = lines[0].strip().split("\t")
-    try:
-        seq_index = next(i for i, col in enumerate(header) if col.lower() == "residue_sequence")
-    except StopIteration:
-        # If not found, assume it is the second column (index 1)
-        seq_index = 1
-
-    # Process data lines
-    for line in lines[1:]:
-        line = line.strip()
-        if not line:
-            continue
-        cols = line.split("\t")
-        if len(cols) <= seq_index:
-            continue
-        sequence = cols[seq_index].strip()
-        if sequence:
-            sequences.append(sequence)
-    return sequences
-
-
-def get_interactions_from_sequence(seq):
-    """
-    For a given residue sequence (string), compute all unique unordered interactions.
-    For every pair (i, j) with i < j, form the candidate as seq[i] + seq[j].
-    If either candidate or its reverse is already recorded in this fragment, skip it.
-
-    Returns:
-        A set of interaction strings.
-    """
-    interactions = set()
-    n = len(seq)
-    for i in range(n - 1):
-        for j in range(i + 1, n):
-            candidate = seq[i] + seq[j]
-            reverse_candidate = seq[j] + seq[i]
-            # If either candidate or its reverse is already present, skip adding candidate
-            if candidate in interactions or reverse_candidate in interactions:
+        header_line = next(f, None)
+        if header_line is None:
+            print("Input file is empty.")
+            return
+
+        # Assume first line is header; find index of "Residue_sequence" (case-insensitive),
+        # or else assume it is the second column (index 1)
+        header = header_line.strip().split("\t")
+        seq_index = next((i for i, col in enumerate(header) if col.lower() == "residue_sequence"), 1)
+
+        # Process data lines
+        for line in f:
+            line = line.strip()
+            if not line:
                 continue
-            interactions.add(candidate)
-    return interactions
+            cols = line.split("\t")
+            if len(cols) <= seq_index:
+                continue
+            sequence = cols[seq_index].strip()
+            if sequence:
+                yield sequence
 
 
 def aggregate_interactions(sequences):
     """
-    Aggregate interactions from a list of residue sequences.
+    Aggregate interactions from an iterable of residue sequences (consumed once).
+    Every pair of distinct residue types in a fragment interacts (they always form some
+    pair i < j), and a residue type interacts with itself if it occurs at least twice.
+    Each fragment is turned into a letter histogram with np.bincount; the upper triangle of
+    the outer product of its presence vector (diagonal: count >= 2) is added to a
+    byte-by-byte count matrix, so no per-pair Python work is done.
+    Interactions are written in canonical (sorted) letter order, e.g. "KP", never "PK".
 
     Returns:
-        A Counter object mapping each interaction (string) to its count across all sequences.
+        (counter, n_sequences): a Counter mapping each interaction (string) to its count
+        across all sequences, and the number of sequences read.
     """
-    interaction_counter = Counter()
+    n_sequences = 0
+    pair_counts = np.zeros((256, 256), dtype=np.int64)
+    upper = np.triu(np.ones((256, 256), dtype=bool), k=1)
     for seq in sequences:
-        inter_set = get_interactions_from_sequence(seq)
-        interaction_counter.update(inter_set)
-    return interaction_counter
+        letter_counts = np.bincount(np.frombuffer(seq.encode(), dtype=np.uint8), minlength=256)
+        present = letter_counts > 0
+        pairs = np.outer(present, present) & upper
+        np.fill_diagonal(pairs, letter_counts >= 2)
+        pair_counts += pairs
+        n_sequences += 1
+
+    rows, cols = np.nonzero(pair_counts)
+    counter = Counter({chr(a) + chr(b): int(pair_counts[a, b]) for a, b in zip(rows.tolist(), cols.tolist())})
+    return counter, n_sequences
 
 
 def write_interactions(counter, output_file):
@@ -113,13 +104,13 @@ def write_interactions(counter, output_file):
 
 
 def main():
-    sequences = parse_benchmark_file(INPUT_FILE)
-    if not sequences:
+    # Sequences are streamed from the file straight into the aggregation
+    interaction_counter, n_sequences = aggregate_interactions(parse_benchmark_file(INPUT_FILE))
+    if n_sequences == 0:
         print("No sequences found, exiting.")
         sys.exit(1)
-    print(f"Found {len(sequences)} sequences in the benchmark file.")
+    print(f"Found {n_sequences} sequences in the benchmark file.")
 
-    interaction_counter = aggregate_interactions(sequences)
     print(f"Found {len(interaction_counter)} unique interactions across all sequences.")
 
     write_interactions(interaction_counter, OUTPUT_FILE)
@@ -4,8 +4,8 @@
 This script reads an interactions summary file where each line contains a
 two-letter interaction (e.g. "KP") and a frequency count.
 It builds a symmetric 20x20 matrix for all standard amino acids.
-The heatmap is plotted using seaborn.heatmap with the "RdBu_r" colormap,
-with linear normalization from 0 to 38. Each cell in the heatmap is annotated
+The heatmap is plotted using matplotlib imshow with the "RdBu_r" colormap,
+with linear normalization from 0 to 17. Each cell in the heatmap is annotated
 with the corresponding data value.
 All fonts are set to Arial.
 The final heatmap is saved as an image file.
@@ -13,7 +13,6 @@ The final heatmap is saved as an image file.
 
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
 
 # ==================== User Configuration ====================
 INPUT_FILE = "interactions_summary.txt"  # Input file (e.g., "KP    10")
@@ -62,43 +61,65 @@ def build_interaction_matrix(interactions, all_aas):
     Build a symmetric interaction matrix for all amino acids in all_aas.
     Rows and columns correspond to amino acids in the provided list.
     For each interaction (aa1, aa2, count), if both amino acids are in all_aas,
-    add the count to the corresponding cell and ensure symmetry.
+    add the count to the upper-triangle cell (i <= j); the matrix is made
+    symmetric once at the end instead of storing every count twice.
 
     Returns a numpy array of shape (n, n), where n = len(all_aas).
     """
     n = len(all_aas)
-    matrix = np.zeros((n, n), dtype=float)
+    tri = np.zeros((n, n), dtype=float)
     aa_index = {aa: i for i, aa in enumerate(all_aas)}
 
     for aa1, aa2, count in interactions:
         if aa1 in aa_index and aa2 in aa_index:
-            i = aa_index[aa1]
-            j = aa_index[aa2]
-            matrix[i, j] += count
-            if i != j:
-                matrix[j, i] += count
+            i, j = sorted((aa_index[aa1], aa_index[aa2]))
+            tri[i, j] += count
+
+    # Mirror the strict upper triangle; the diagonal is kept once
+    matrix = tri + tri.T
+    np.fill_diagonal(matrix, np.diag(tri))
     return matrix
 
 
 def plot_heatmap(all_aas, matrix, output_file):
     """
-    Plot a heatmap of the interaction matrix using seaborn.
-    Uses the "RdBu_r" colormap with linear normalization (vmin=0, vmax=38).
-    Each cell is annotated with its numerical value (formatted to one decimal).
+    Plot a heatmap of the interaction matrix with matplotlib imshow.
+    Uses the "RdBu_r" colormap with linear normalization (vmin=0, vmax=17).
+    Each cell is annotated with its numerical value (formatted to no decimals), in black
+    on light cells and white on dark ones; the labels are formatted in one np.char.mod call.
     The x-axis and y-axis display all standard amino acids.
     """
     # Set font to Arial
     plt.rcParams["font.family"] = "Arial"
 
     norm = plt.Normalize(vmin=0, vmax=17)
+    n = len(all_aas)
 
     fig, ax = plt.subplots(figsize=FIGSIZE)
 
-    # Plot heatmap with annotation enabled and specify the format (e.g., one decimal place)
-    hm = sns.heatmap(matrix, cmap="RdBu_r", norm=norm,
-                     annot=True, fmt=".0f", annot_kws={"fontsize": 10},
-                     xticklabels=all_aas, yticklabels=all_aas, ax=ax,
-                     linewidths=2, linecolor="white")
+    # The whole matrix is drawn as a single image
+    im = ax.imshow(matrix, cmap="RdBu_r", norm=norm, aspect="equal")
+    fig.colorbar(im, ax=ax)
+
+    # White separators between cells
+    ax.set_xticks(np.arange(n + 1) - 0.5, minor=True)
+    ax.set_yticks(np.arange(n + 1) - 0.5, minor=True)
+    ax.grid(which="minor", color="white", linewidth=2)
+    ax.tick_params(which="minor", length=0)
+    ax.spines[:].set_visible(False)
+
+    # Annotations: text color from the relative luminance of each cell color
+    labels = np.char.mod("%.0f", matrix)
+    rgb = im.cmap(norm(matrix))[..., :3]
+    luminance = rgb @ np.array([0.2126, 0.7152, 0.0722])
+    text_colors = np.where(luminance > 0.408, "black", "white")
+    for i, j in np.ndindex(matrix.shape):
+        ax.text(j, i, labels[i, j], ha="center", va="center", fontsize=10, color=text_colors[i, j])
+
+    ax.set_xticks(np.arange(n))
+    ax.set_xticklabels(all_aas)
+    ax.set_yticks(np.arange(n))
+    ax.set_yticklabels(all_aas)
 
     # Rotate x-axis labels for clarity
     plt.setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
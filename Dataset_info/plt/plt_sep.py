@@ -90,7 +90,7 @@ def merge_comparison_data(file_af2, file_af3):
     data_af3 = read_compare_file(file_af3)
 
     merged = {}
-    all_ids = set(data_af2.keys()) | set(data_af3.keys())
+    all_ids = data_af2.keys() | data_af3.keys()  # set operation straight on the key views
     for pdb_id in all_ids:
         q_val = None
         af2_val = None
@@ -15,6 +15,10 @@ The output format for each line is:
 
 import os
 import re
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
 
 # ====================== User Configuration ======================
 INDEX_FILE = "group_index.txt"  # Group index file, containing [Group S/M/L] and protein IDs.
@@ -29,6 +33,7 @@ S_AFF_FILE = "S/affinity_compare.txt"
 M_AFF_FILE = "M/affinity_compare.txt"
 L_AFF_FILE = "L/affinity_compare.txt"
 
+GROUP_PATTERN = re.compile(r'^\[Group\s+([SML])\]')  # Group header line, e.g. "[Group S]"
 
 # ==============================================================
 
@@ -48,11 +53,12 @@ def parse_group_index(index_file):
             line_s = line.strip()
             if not line_s:
                 continue
-            # Match "[Group X]"
-            grp_match = re.match(r'^\[Group\s+([SML])\]', line_s)
-            if grp_match:
-                current_group = grp_match.group(1)
-                continue
+            # Match "[Group X]"; the regex only runs on the rare header lines
+            if line_s.startswith("[Group"):
+                grp_match = GROUP_PATTERN.match(line_s)
+                if grp_match:
+                    current_group = grp_match.group(1)
+                    continue
             # Skip lines starting with "length_"
             if line_s.startswith("length_"):
                 continue
@@ -68,115 +74,113 @@ def parse_docking_file(file_path):
     Parse the new-format docking result file.
     Each line is expected to be in the format:
         pdb_id<TAB>value
-    Returns a dictionary: { pdb_id: value }
+    Comment lines and non-numeric values are skipped; tokenizing and float parsing
+    happen inside pandas.read_csv. Later lines win for repeated pdb_ids.
+    Returns a DataFrame with columns (pdb_id, value).
     """
-    data_map = {}
-    with open(file_path, "r", encoding="utf-8") as f:
-        for line in f:
-            line_s = line.strip()
-            # Skip empty lines and comments
-            if not line_s or line_s.startswith("#"):
-                continue
-            parts = line_s.split()
-            if len(parts) < 2:
-                continue
-            pdb_id = parts[0]
-            try:
-                value = float(parts[1])
-                data_map[pdb_id] = value
-            except ValueError:
-                continue
-    return data_map
+    df = pd.read_csv(file_path, sep=r"\s+", header=None, comment="#", usecols=[0, 1],
+                     names=["pdb_id", "value"], dtype=str, engine="c")
+    df["value"] = pd.to_numeric(df["value"], errors="coerce")
+    df = df.dropna()
+    return df.drop_duplicates("pdb_id", keep="last")
 
 
 def compare_affinity(quantum_data, af2_data):
     """
     Compare affinity values between quantum and af2.
     Lower value is better.
-    Returns a list of tuples:
+    The two tables are inner-joined on pdb_id, so only pdb_ids existing in both datasets
+    are compared, and every winner is decided in one vectorized comparison.
+    Returns a list of tuples, in the order of quantum_data (sorting is left to the writers):
       (pdb_id, quantum_value, af2_value, better, line_str)
     where line_str is formatted as:
       "pdb_id    quantum=-3.138    af2=-2.752    better=quantum"
-    Only pdb_ids existing in both datasets are compared.
     """
-    results = []
-    common_ids = set(quantum_data.keys()) & set(af2_data.keys())
-    for pdb_id in sorted(common_ids):
-        q_val = quantum_data[pdb_id]
-        a_val = af2_data[pdb_id]
-        if q_val < a_val:
-            better = "quantum"
-        elif q_val > a_val:
-            better = "af2"
-        else:
-            better = "tie"
-        line_str = f"{pdb_id}\tquantum={q_val:.3f}\taf2={a_val:.3f}\tbetter={better}"
-        results.append((pdb_id, q_val, a_val, better, line_str))
-    return results
+    merged = quantum_data.merge(af2_data, on="pdb_id", suffixes=("_q", "_a"))
+    q_vals = merged["value_q"].to_numpy()
+    a_vals = merged["value_a"].to_numpy()
+    better = np.where(q_vals < a_vals, "quantum", np.where(q_vals > a_vals, "af2", "tie"))
+    # Build the whole line column at once instead of formatting row by row
+    line_str = (merged["pdb_id"] + "\tquantum=" + merged["value_q"].map("{:.3f}".format)
+                + "\taf2=" + merged["value_a"].map("{:.3f}".format) + "\tbetter=" + better)
+    return list(zip(merged["pdb_id"].tolist(), q_vals.tolist(), a_vals.tolist(), better.tolist(),
+                    line_str.tolist()))
 
 
 def write_compare_all(results, out_path):
     """
-    Write the overall affinity comparison fig to out_path.
+    Write the overall affinity comparison fig to out_path, sorted by pdb_id.
+    results is sorted in place, once, here at write time.
+    The lines are collected in a list and written with a single write call.
     """
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write("# Compare affinity: quantum vs af2 (lower is better)\n\n")
-        for pdb_id, q_val, a_val, better, line_str in results:
-            f.write(line_str + "\n")
-        total = len(results)
-        if total == 0:
-            f.write("\n# No data.\n\n")
-            return
-        quantum_better = sum(1 for _, _, _, b, _ in results if b == "quantum")
-        af2_better = sum(1 for _, _, _, b, _ in results if b == "af2")
+    results.sort(key=itemgetter(0))
+    out_lines = ["# Compare affinity: quantum vs af2 (lower is better)\n\n"]
+    # Count the winners while collecting the lines, in the same pass over results
+    quantum_better = af2_better = 0
+    for pdb_id, q_val, a_val, better, line_str in results:
+        out_lines.append(line_str + "\n")
+        quantum_better += better == "quantum"
+        af2_better += better == "af2"
+    total = len(results)
+    if total == 0:
+        out_lines.append("\n# No data.\n\n")
+    else:
         tie_count = total - quantum_better - af2_better
         qb_pct = quantum_better / total * 100
         ab_pct = af2_better / total * 100
         tie_pct = tie_count / total * 100
-        f.write(f"\n# total={total}\n")
-        f.write(f"# quantum better: {quantum_better} ({qb_pct:.1f}%)\n")
-        f.write(f"# af2 better: {af2_better} ({ab_pct:.1f}%)\n")
+        out_lines.append(f"\n# total={total}\n")
+        out_lines.append(f"# quantum better: {quantum_better} ({qb_pct:.1f}%)\n")
+        out_lines.append(f"# af2 better: {af2_better} ({ab_pct:.1f}%)\n")
         if tie_count > 0:
-            f.write(f"# tie: {tie_count} ({tie_pct:.1f}%)\n")
-        f.write("\n")
+            out_lines.append(f"# tie: {tie_count} ({tie_pct:.1f}%)\n")
+        out_lines.append("\n")
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write("".join(out_lines))
 
 
 def distribute_and_stats(results, group_map, s_file, m_file, l_file):
     """
     Distribute the comparison fig into group-specific files based on group_map.
     """
-    S_list, M_list, L_list = [], [], []
-    for pdb_id, q_val, a_val, better, line_str in results:
-        if pdb_id in group_map["S"]:
-            S_list.append((pdb_id, q_val, a_val, better, line_str))
-        elif pdb_id in group_map["M"]:
-            M_list.append((pdb_id, q_val, a_val, better, line_str))
-        elif pdb_id in group_map["L"]:
-            L_list.append((pdb_id, q_val, a_val, better, line_str))
+    # Map each id straight to the append method of its group's list, so each row
+    # needs a single dict lookup; filling L, M, S in that order keeps S > M > L
+    # precedence for an id listed in several groups
+    buckets = {"S": [], "M": [], "L": []}
+    id_to_append = {pdb_id: buckets[g].append for g in ("L", "M", "S") for pdb_id in group_map[g]}
+    lookup = id_to_append.get
+    for row in results:
+        append = lookup(row[0])
+        if append:
+            append(row)
 
     def write_list_and_stats(rows, f_out):
-        quantum_better = sum(1 for _, _, _, b, _ in rows if b == "quantum")
-        af2_better = sum(1 for _, _, _, b, _ in rows if b == "af2")
-        tie_count = len(rows) - quantum_better - af2_better
-        for _, _, _, _, line_str in rows:
-            f_out.write(line_str + "\n")
+        rows.sort(key=itemgetter(0))  # linear when results was already sorted
+        out_lines = []
+        quantum_better = af2_better = 0
+        for _, _, _, better, line_str in rows:
+            out_lines.append(line_str + "\n")
+            quantum_better += better == "quantum"
+            af2_better += better == "af2"
         total = len(rows)
+        tie_count = total - quantum_better - af2_better
         if total == 0:
-            f_out.write("\n# No data.\n\n")
-            return
-        qb_pct = quantum_better / total * 100
-        ab_pct = af2_better / total * 100
-        tie_pct = tie_count / total * 100
-        f_out.write(f"\n# total={total}\n")
-        f_out.write(f"# quantum better: {quantum_better} ({qb_pct:.1f}%)\n")
-        f_out.write(f"# af2 better: {af2_better} ({ab_pct:.1f}%)\n")
-        if tie_count > 0:
-            f_out.write(f"# tie: {tie_count} ({tie_pct:.1f}%)\n")
-        f_out.write("\n")
-
-    write_list_and_stats(S_list, s_file)
-    write_list_and_stats(M_list, m_file)
-    write_list_and_stats(L_list, l_file)
+            out_lines.append("\n# No data.\n\n")
+        else:
+            qb_pct = quantum_better / total * 100
+            ab_pct = af2_better / total * 100
+            tie_pct = tie_count / total * 100
+            out_lines.append(f"\n# total={total}\n")
+            out_lines.append(f"# quantum better: {quantum_better} ({qb_pct:.1f}%)\n")
+            out_lines.append(f"# af2 better: {af2_better} ({ab_pct:.1f}%)\n")
+            if tie_count > 0:
+                out_lines.append(f"# tie: {tie_count} ({tie_pct:.1f}%)\n")
+            out_lines.append("\n")
+        f_out.write("".join(out_lines))
+
+    write_list_and_stats(buckets["S"], s_file)
+    write_list_and_stats(buckets["M"], m_file)
+    write_list_and_stats(buckets["L"], l_file)
 
 
 def main():
@@ -15,6 +15,10 @@ OUTPUT_S_FILE = "S/rmsd_compare.txt"
 OUTPUT_M_FILE = "M/rmsd_compare.txt"
 OUTPUT_L_FILE = "L/rmsd_compare.txt"
 
+# 分组标题行, 如 "[Group S]"
+GROUP_PATTERN = re.compile(r'^\[Group\s+([SML])\]')
+# 对比行: pdb_id  quantum=xxx  af2=yyy  better=zzz
+COMPARE_LINE_PATTERN = re.compile(r'^(\S+)\s+quantum=([-\d.]+)\s+af2=([-\d.]+)\s+better=(\S+)')
 
 
 def parse_group_index(index_file):
@@ -31,11 +35,12 @@ def parse_group_index(index_file):
             if not line_s:
                 continue
 
-            # 匹配 [Group X]
-            grp_match = re.match(r'^\[Group\s+([SML])\]', line_s)
-            if grp_match:
-                current_group = grp_match.group(1)  # 'S' or 'M' or 'L'
-                continue
+            # 匹配 [Group X]; 只有以 "[Group" 开头的少数行才需要跑正则
+            if line_s.startswith("[Group"):
+                grp_match = GROUP_PATTERN.match(line_s)
+                if grp_match:
+                    current_group = grp_match.group(1)  # 'S' or 'M' or 'L'
+                    continue
 
             # 如果行以 "length_" 开头，则是 "length_10:" 之类，跳过
             if line_s.startswith("length_"):
@@ -66,34 +71,19 @@ def parse_compare_lines(compare_file):
             if not line_s or line_s.startswith("#"):
                 continue
 
-            # 先分拆出 pdb_id
-            parts = line_s.split(None, 1)
-            if len(parts) < 2:
-                continue
-            pdb_id = parts[0]
-            rest = parts[1]
-
-            # 从余下字符串里提取 "quantum=xxx" "af3=yyy" "better=zzz"
-            # 简单用正则
-            # quantum=([-\d\.]+)
-            # af3=([-\d\.]+)
-            # better=(\S+)
-            q_pat = re.search(r'quantum=([-\d\.]+)', rest)
-            a_pat = re.search(r'af2=([-\d\.]+)', rest)
-            b_pat = re.search(r'better=(\S+)', rest)
-
-            if not q_pat or not a_pat or not b_pat:
+            # 一次匹配取出 pdb_id、quantum、af2、better 四个字段
+            m = COMPARE_LINE_PATTERN.match(line_s)
+            if not m:
                 # 如果有行缺失信息，就跳过或继续
                 continue
+            pdb_id, q_str, a_str, better_str = m.groups()  # better_str: "quantum" / "af2" / "tie" ...
 
             try:
-                q_val = float(q_pat.group(1))
-                a_val = float(a_pat.group(1))
+                q_val = float(q_str)
+                a_val = float(a_str)
             except ValueError:
                 continue
 
-            better_str = b_pat.group(1)  # "quantum" / "af3" / "tie" ...
-
             results.append((pdb_id, q_val, a_val, better_str, line_s))
 
     return results
@@ -109,34 +99,37 @@ def write_group_file(group_lines, output_path):
     af2_better = 0
     tie_count = 0
 
-    with open(output_path, "w", encoding="utf-8") as out_f:
-        # 可写个表头
-        # out_f.write("# Compare fig for this group\n\n")
-
-        for (pdb_id, q_val, a_val, better_str, full_line) in group_lines:
-            out_f.write(full_line + "\n")
-            # 统计
-            if better_str == "quantum":
-                quantum_better += 1
-            elif better_str == "af2":
-                af2_better += 1
-            else:
-                tie_count += 1
-
-        # 统计结束
-        total = len(group_lines)
-        if total == 0:
-            out_f.write("\n# No data in this group.\n")
-            return
+    # 先把所有行收集到列表里，最后一次性写入文件
+    # 可写个表头
+    # out_lines = ["# Compare fig for this group\n\n"]
+    out_lines = []
+
+    for (pdb_id, q_val, a_val, better_str, full_line) in group_lines:
+        out_lines.append(full_line + "\n")
+        # 统计
+        if better_str == "quantum":
+            quantum_better += 1
+        elif better_str == "af2":
+            af2_better += 1
+        else:
+            tie_count += 1
 
+    # 统计结束
+    total = len(group_lines)
+    if total == 0:
+        out_lines.append("\n# No data in this group.\n")
+    else:
         qb_pct = quantum_better / total * 100
         ab_pct = af2_better / total * 100
         tie_pct = tie_count / total * 100
-        out_f.write(f"\n# total={total}\n")
-        out_f.write(f"# quantum better: {quantum_better} ({qb_pct:.1f}%)\n")
-        out_f.write(f"# af2 better: {af2_better} ({ab_pct:.1f}%)\n")
+        out_lines.append(f"\n# total={total}\n")
+        out_lines.append(f"# quantum better: {quantum_better} ({qb_pct:.1f}%)\n")
+        out_lines.append(f"# af2 better: {af2_better} ({ab_pct:.1f}%)\n")
         if tie_count > 0:
-            out_f.write(f"# tie: {tie_count} ({tie_pct:.1f}%)\n")
+            out_lines.append(f"# tie: {tie_count} ({tie_pct:.1f}%)\n")
+
+    with open(output_path, "w", encoding="utf-8") as out_f:
+        out_f.write("".join(out_lines))
 
 
 def main():
@@ -146,26 +139,22 @@ def main():
     # 2) 解析 compare 结果 => 返回列表 [ (pdb_id, q_val, a_val, better, line_str), ... ]
     compare_data = parse_compare_lines(COMPARE_FILE)
 
-    # 3) 分桶: S_lines, M_lines, L_lines
-    S_lines = []
-    M_lines = []
-    L_lines = []
-
-    for (pdb_id, q_val, a_val, better_str, line_str) in compare_data:
-        if pdb_id in group_map["S"]:
-            S_lines.append((pdb_id, q_val, a_val, better_str, line_str))
-        elif pdb_id in group_map["M"]:
-            M_lines.append((pdb_id, q_val, a_val, better_str, line_str))
-        elif pdb_id in group_map["L"]:
-            L_lines.append((pdb_id, q_val, a_val, better_str, line_str))
-        else:
-            # 不在 S/M/L => 忽略 or 另建一个 others list
-            pass
+    # 3) 分桶: 把 group_map 反转成 { pdb_id: 该组列表的 append }，每行只查一次 dict
+    #    按 L、M、S 顺序填充，同一 ID 出现在多个组时仍以 S > M > L 为准
+    buckets = {"S": [], "M": [], "L": []}
+    id_to_append = {pdb_id: buckets[g].append for g in ("L", "M", "S") for pdb_id in group_map[g]}
+    lookup = id_to_append.get
+
+    for row in compare_data:
+        append = lookup(row[0])
+        if append:
+            append(row)
+        # 不在 S/M/L => 忽略
 
     # 4) 分别写文件
-    write_group_file(S_lines, OUTPUT_S_FILE)
-    write_group_file(M_lines, OUTPUT_M_FILE)
-    write_group_file(L_lines, OUTPUT_L_FILE)
+    write_group_file(buckets["S"], OUTPUT_S_FILE)
+    write_group_file(buckets["M"], OUTPUT_M_FILE)
+    write_group_file(buckets["L"], OUTPUT_L_FILE)
 
     print("分组完成, 并在各文件统计 quantum/af2/tie 百分比.")
     print(f"S => {OUTPUT_S_FILE}")
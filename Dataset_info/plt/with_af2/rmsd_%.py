@@ -9,6 +9,9 @@
 
 import os
 
+import numpy as np
+import pandas as pd
+
 QUANTUM_FILE = "result_summary/q_rmsd_summary.txt"  # quantum方法的结果文件
 AF3_FILE = "result_summary/af2_rmsd_summary.txt"  # af3方法的结果文件
 OUTPUT_FILE = "all/rmsd_compare.txt"  # 对比输出文件
@@ -21,25 +24,15 @@ def load_rmsd_data(file_path):
     从形如:
         1e1x   1.163
         1e2k   2.835
-    的文件中解析出一个 dict: { pdb_id: rmsd_val, ... }。
-    跳过空行或注释行(#开头)。
+    的文件中读出一个 DataFrame (pdb_id, rmsd)。
+    跳过空行、注释行(#开头)以及无法转成数值的行(如 "N/A (原因)")；
+    由 pandas.read_csv 在 C 层完成分词与浮点转换。同一 pdb_id 出现多次时以最后一行为准。
     """
-    data = {}
-    with open(file_path, "r", encoding="utf-8") as f:
-        for line in f:
-            line_s = line.strip()
-            if not line_s or line_s.startswith("#"):
-                continue
-            cols = line_s.split()
-            if len(cols) < 2:
-                continue
-            pdb_id = cols[0]
-            try:
-                rmsd_val = float(cols[1])
-                data[pdb_id] = rmsd_val
-            except ValueError:
-                pass
-    return data
+    df = pd.read_csv(file_path, sep=r"\s+", header=None, comment="#", usecols=[0, 1],
+                     names=["pdb_id", "rmsd"], dtype=str, engine="c")
+    df["rmsd"] = pd.to_numeric(df["rmsd"], errors="coerce")
+    df = df.dropna()
+    return df.drop_duplicates("pdb_id", keep="last")
 
 
 def main():
@@ -47,10 +40,22 @@ def main():
     quantum_data = load_rmsd_data(QUANTUM_FILE)
     af3_data = load_rmsd_data(AF3_FILE)
 
-    # 统计计数
-    quantum_better = 0
-    af3_better = 0
-    tie_count = 0
+    # 按 pdb_id 做内连接(hash join)，只保留两边共有的 ID
+    # 如果你想对所有出现的 pdb_id 做对比(哪家没有就记录N/A),
+    # 也可用 how="outer"，这里示例只对共有ID
+    merged = quantum_data.merge(af3_data, on="pdb_id", suffixes=("_q", "_a")).sort_values("pdb_id")
+
+    # 向量化比较: 0 = quantum 更好, 1 = af2 更好, 2 = 持平
+    q_rmsd = merged["rmsd_q"].to_numpy()
+    a_rmsd = merged["rmsd_a"].to_numpy()
+    better_code = np.where(q_rmsd < a_rmsd, 0, np.where(q_rmsd > a_rmsd, 1, 2))
+    quantum_better, af3_better, tie_count = np.bincount(better_code, minlength=3).tolist()
+    better_method = np.array(["quantum", "af2", "tie"])[better_code]
+
+    # 整列拼接出每一行，字符串连接在 pandas 内部完成
+    lines = (merged["pdb_id"] + "\tquantum=" + merged["rmsd_q"].map("{:.3f}".format)
+             + "\taf2=" + merged["rmsd_a"].map("{:.3f}".format)
+             + "\tbetter=" + better_method + "\n")
 
     # 准备输出
     with open(OUTPUT_FILE, "w", encoding="utf-8") as out_f:
@@ -58,31 +63,10 @@ def main():
         out_f.write("# Compare RMSD fig between quantum and af3\n")
         out_f.write("# Format: pdb_id   quantum=...   af2=...   better=...\n\n")
 
-        # 找到共同的 pdb_id 集合
-        common_ids = set(quantum_data.keys()) & set(af3_data.keys())
-        # 如果你想对所有出现的 pdb_id 做对比(哪家没有就记录N/A),
-        # 也可用 set(quantum_data.keys()) | set(af3_data.keys())，这里示例只对共有ID
-
-        for pdb_id in sorted(common_ids):
-            q_rmsd = quantum_data[pdb_id]
-            a_rmsd = af3_data[pdb_id]
-
-            if q_rmsd < a_rmsd:
-                better_method = "quantum"
-                quantum_better += 1
-            elif q_rmsd > a_rmsd:
-                better_method = "af2"
-                af3_better += 1
-            else:
-                better_method = "tie"
-                tie_count += 1
-
-            line_out = (f"{pdb_id}\tquantum={q_rmsd:.3f}\taf2={a_rmsd:.3f}\t"
-                        f"better={better_method}\n")
-            out_f.write(line_out)
+        out_f.write("".join(lines))
 
         # 再写一下统计信息
-        total_compared = len(common_ids)
+        total_compared = len(merged)
         # 避免除0
         if total_compared == 0:
             out_f.write("\n# No common pdb_id found between two files.\n")
@@ -0,0 +1,21 @@
+# --*-- conding:utf-8 --*--
+# @File : test_vis_rmde.py
+
+import numpy as np
+
+from vis_rmde import read_pdb_atoms
+
+
+def test_read_pdb_atoms_accepts_records_longer_than_80_columns(tmp_path):
+    short = "ATOM      1  CA  ALA A  10      11.104   6.134  -6.504  1.00  0.00           C"
+    long_ = "ATOM      2  CA  GLY A  11      12.560   7.021  -5.001  1.00  0.00           C  extra columns"
+    pdb_path = tmp_path / "long.pdb"
+    pdb_path.write_text(short + "\n" + long_ + "\nEND\n")
+
+    lines, names, chains, resnums, coords = read_pdb_atoms(pdb_path)
+
+    assert all(len(line) == 80 for line in lines)
+    assert names.tolist() == [b"CA", b"CA"]
+    assert chains.tolist() == [b"A", b"A"]
+    assert resnums.tolist() == [10, 11]
+    np.testing.assert_allclose(coords, [[11.104, 6.134, -6.504], [12.560, 7.021, -5.001]])
@@ -11,7 +11,9 @@ as a new pdb file.
 """
 
 import os
-from Bio.PDB import PDBParser, PDBIO, Select, Superimposer
+
+import numpy as np
+from Bio.PDB import PDBParser
 
 # ================== User-specified parameters ==================
 # Manual specification of target pdb id and chain
@@ -35,55 +37,83 @@ OUTPUT_FILE = f"aligned_fragment_{PDB_ID}.pdb"  # Output file name for aligned p
 
 # ===============================================================
 
-class ResidueSelect(Select):
+def read_pdb_atoms(pdb_path):
     """
-    A Select class for PDBIO to save only residues in a given residue number range from a specified chain.
+    Read the ATOM/HETATM records of the first model of a PDB file without building a
+    Bio.PDB object tree. The records are cut or padded to 80 columns and viewed as one fixed-width
+    byte array, so the columns are cut and converted by NumPy:
+    atom name (13-16), chain (22), residue number (23-26) and x, y, z (31-54).
+    Returns (lines, names, chains, resnums, coords) with lines the raw records as bytes
+    and coords an (M, 3) float64 array.
     """
-
-    def __init__(self, chain_id, start_res, end_res):
-        self.chain_id = chain_id
-        self.start_res = start_res
-        self.end_res = end_res
-
-    def accept_residue(self, residue):
-        # The residue id is a tuple, second element is the residue number
-        resnum = residue.get_id()[1]
-        if self.start_res <= resnum <= self.end_res:
-            return 1
-        return 0
+    lines = []
+    with open(pdb_path, "rb") as f:
+        for line in f.read().splitlines():
+            if line.startswith((b"ATOM  ", b"HETATM")):
+                lines.append(line[:80].ljust(80))
+            elif line.startswith(b"ENDMDL"):
+                break
+    records = np.frombuffer(b"".join(lines), dtype="S1").reshape(-1, 80)
+    names = np.char.strip(records[:, 12:16].copy().view("S4").ravel())
+    chains = records[:, 21].copy()
+    resnums = records[:, 22:26].copy().view("S4").ravel().astype(np.int64)
+    coords = records[:, 30:54].copy().view("S8").astype(np.float64)
+    return lines, names, chains, resnums, coords
+
+
+def write_pdb_fragment(pdb_path, lines, coords, keep):
+    """
+    Write the records selected by the boolean mask keep with their new coordinates,
+    renumbering the atom serials from 1, ending each chain with a TER record and the
+    file with END (the layout Bio.PDB.PDBIO writes).
+    """
+    out_lines = []
+    serial = 0
+    kept = np.flatnonzero(keep)
+    for k, idx in enumerate(kept):
+        serial += 1
+        line = lines[idx]
+        x, y, z = coords[idx]
+        out_lines.append(b"%s%5d%s%8.3f%8.3f%8.3f%s\n" % (line[:6], serial, line[11:30], x, y, z, line[54:80]))
+        # TER after the last atom of a chain (PDBIO pads TER records to 81 columns)
+        if k + 1 == len(kept) or lines[kept[k + 1]][21] != line[21]:
+            serial += 1
+            out_lines.append((b"TER   %5d      %s" % (serial, line[17:27])).ljust(81) + b"\n")
+    out_lines.append(b"END   \n")
+    with open(pdb_path, "wb") as f:
+        f.write(b"".join(out_lines))
 
 
 def extract_ca_atoms(structure, chain_id, start_res, end_res):
     """
-    Extract CA atoms from the first model of the structure in the specified chain and residue range.
-    Returns a list of CA atoms.
+    Extract CA atom coordinates from the first model of the structure in the specified chain and residue range.
+    Residues are matched on their sequence number only, so hetero residues (e.g. MSE) and
+    residues with insertion codes inside the range are kept.
+    Returns an (N, 3) float64 array of CA coordinates.
     """
-    ca_atoms = []
-    model = structure[0]
-    chain = model[chain_id]
-    for residue in chain:
-        resnum = residue.get_id()[1]
-        if start_res <= resnum <= end_res:
-            if "CA" in residue:
-                ca_atoms.append(residue["CA"])
-    return ca_atoms
-
-
-def extract_fragment_structure(structure, chain_id, start_res, end_res):
+    chain = structure[0][chain_id]
+    coords = [residue["CA"].get_coord() for residue in chain
+              if start_res <= residue.get_id()[1] <= end_res and "CA" in residue]
+    return np.array(coords, dtype=np.float64).reshape(-1, 3)
+
+
+def kabsch(fixed, moving):
     """
-    Extract a fragment substructure (only residues in the specified range from the chain)
-    from the given structure.
-    Returns a new structure containing only the pdbbind residues.
+    Find the rotation and translation that best superimpose the (N, 3) array moving onto fixed
+    (SVD of the 3x3 covariance matrix, with a reflection check).
+    Uses the same convention as Bio.PDB.Superimposer: moved = moving @ rot + tran.
+    Returns (rot, tran, rms).
     """
-    io = PDBIO()
-    io.set_structure(structure)
-    temp_filename = "temp_fragment.pdb"
-    io.save(temp_filename, select=ResidueSelect(chain_id, start_res, end_res))
-
-    parser = PDBParser(QUIET=True)
-    fragment_struct = parser.get_structure("fragment", temp_filename)
-    os.remove(temp_filename)  # Remove temporary file
-    return fragment_struct
+    fixed_center = fixed.mean(axis=0)
+    moving_center = moving.mean(axis=0)
+    H = (moving - moving_center).T @ (fixed - fixed_center)
+    U, _, Vt = np.linalg.svd(H)
+    d = np.sign(np.linalg.det(U @ Vt))
+    rot = U @ np.diag([1.0, 1.0, d]) @ Vt
+    tran = fixed_center - moving_center @ rot
+    diff = moving @ rot + tran - fixed
+    rms = np.sqrt((diff * diff).sum() / len(fixed))
+    return rot, tran, rms
 
 
 def main():
@@ -98,39 +128,35 @@ def main():
         print(f"Predicted pdb file not found: {PREDICTED_FILE}")
         return
 
-    # Parse the structures
+    # Parse the reference structure; the predicted file is read as plain fixed-width records
     ref_structure = parser.get_structure(f"ref_{PDB_ID}", standard_pdb)
-    pred_structure = parser.get_structure(f"pred_{PDB_ID}", PREDICTED_FILE)
+    pred_lines, pred_names, pred_chains, pred_resnums, pred_coords = read_pdb_atoms(PREDICTED_FILE)
 
-    # Extract CA atoms for the reference fragment from the standard pdb
-    ref_ca_atoms = extract_ca_atoms(ref_structure, CHAIN_ID, REF_START_RES, REF_END_RES)
-    if not ref_ca_atoms:
+    # Extract CA coordinates for the reference fragment from the standard pdb
+    ref_ca_coords = extract_ca_atoms(ref_structure, CHAIN_ID, REF_START_RES, REF_END_RES)
+    if not len(ref_ca_coords):
         print("No CA atoms found in reference fragment.")
         return
 
     # For the predicted structure, assume the corresponding fragment is renumbered starting at 1.
-    pred_ca_atoms = extract_ca_atoms(pred_structure, CHAIN_ID, PRED_START, PRED_END)
-    if not pred_ca_atoms:
+    in_fragment = (pred_resnums >= PRED_START) & (pred_resnums <= PRED_END)
+    pred_ca_coords = pred_coords[in_fragment & (pred_chains == CHAIN_ID.encode()) & (pred_names == b"CA")]
+    if not len(pred_ca_coords):
         print("No CA atoms found in predicted fragment.")
         return
 
-    if len(ref_ca_atoms) != len(pred_ca_atoms):
-        print(f"Mismatch in number of CA atoms: reference {len(ref_ca_atoms)} vs predicted {len(pred_ca_atoms)}")
+    if len(ref_ca_coords) != len(pred_ca_coords):
+        print(f"Mismatch in number of CA atoms: reference {len(ref_ca_coords)} vs predicted {len(pred_ca_coords)}")
         return
 
-    # Use Superimposer to align the predicted fragment to the reference fragment
-    sup = Superimposer()
-    sup.set_atoms(ref_ca_atoms, pred_ca_atoms)
-    print(f"Alignment RMSD: {sup.rms:.3f}")
-    sup.apply(pred_structure.get_atoms())  # Apply transformation to the entire predicted structure if desired
-
-    # Extract the aligned predicted fragment as a new structure
-    aligned_fragment = extract_fragment_structure(pred_structure, CHAIN_ID, PRED_START, PRED_END)
+    # Align the predicted fragment to the reference fragment (Kabsch)
+    rot, tran, rms = kabsch(ref_ca_coords, pred_ca_coords)
+    print(f"Alignment RMSD: {rms:.3f}")
+    # Apply the transformation to all predicted atoms in one matrix product
+    aligned_coords = pred_coords @ rot + tran
 
-    # Save the aligned predicted fragment to OUTPUT_FILE
-    io = PDBIO()
-    io.set_structure(aligned_fragment)
-    io.save(OUTPUT_FILE)
+    # Save only the aligned predicted fragment (its residue range, as before) to OUTPUT_FILE
+    write_pdb_fragment(OUTPUT_FILE, pred_lines, aligned_coords, in_fragment)
     print(f"Aligned fragment saved to {OUTPUT_FILE}")
 
 
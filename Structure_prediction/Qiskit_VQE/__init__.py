@@ -4,5 +4,5 @@
 # @Email : yzhan135@kent.edu
 # @File : __init__.py.py
 
-from .vqe import VQE
+from .vqe import VQE, adaptive_shots
 from .measure import StateCalculator
@@ -4,18 +4,25 @@
 # @Email : yzhan135@kent.edu
 # @File : measure.py
 
+import heapq
+from operator import itemgetter
+
 from qiskit import QuantumCircuit
 from qiskit_ibm_runtime import SamplerV2 as Sampler
 from qiskit.transpiler.preset_passmanagers import generate_preset_pass_manager
 from typing import Dict
 
 class StateCalculator:
-    def __init__(self,service ,min_qubit_num, ansatz: QuantumCircuit):
+    def __init__(self,service ,min_qubit_num, ansatz: QuantumCircuit, backend=None, mode=None):
         """
         Initialize the ProbabilityDistributionCalculator with a predefined ansatz circuit.
+        backend: optional backend to sample on (e.g. the one VQE ran on); the least busy one otherwise.
+        mode: optional open Session on that backend, so the sampling job runs inside it.
         """
         self.service = service
         self.ansatz = ansatz
+        self.backend = backend
+        self.mode = mode
         # self.backend = self._select_backend(min_quits=min_qubit_num)
         self.min_qubits = min_qubit_num
 
@@ -30,13 +37,14 @@ class StateCalculator:
     #     backend = self.service.least_busy(simulator=False, operational=True, min_num_qubits=min_quits)
     #     return backend
 
-    def get_probability_distribution(self, optimized_params) -> Dict:
+    def get_probability_distribution(self, optimized_params, topk=None) -> Dict:
         """
         Calculate the probability distribution by assigning optimized parameters to the ansatz,
         executing the circuit, and returning the measurement fig.
 
         Parameters:
         optimized_params: The parameters to assign to the ansatz circuit.
+        topk: Optional number of most frequent bitstrings to keep (all observed ones when None).
 
         Returns:
         Dict: A dictionary with binary strings as keys and their probabilities as values.
@@ -44,12 +52,12 @@ class StateCalculator:
         circuit = self.ansatz.assign_parameters(optimized_params)
         circuit.measure_all()
 
-        backend = self.service.least_busy(simulator=False, operational=True, min_num_qubits=self.min_qubits)
+        backend = self.backend or self.service.least_busy(simulator=False, operational=True, min_num_qubits=self.min_qubits)
 
         pm = generate_preset_pass_manager(optimization_level=1, backend=backend)
         isa_circuit = pm.run(circuit)
 
-        sampler = Sampler(backend,options={"default_shots": 100000})
+        sampler = Sampler(self.mode or backend,options={"default_shots": 100000})
         job = sampler.run([isa_circuit])
         result = job.result()
 
@@ -60,6 +68,11 @@ class StateCalculator:
         counts = pub_result.data.meas.get_counts()
 
         # total_shots = sum(counts.values())
-        measure_result = {key: value for key, value in counts.items() if value > threshold}
+        if topk is not None:
+            # Partial selection of the most frequent bitstrings instead of keeping every observed one
+            measure_result = dict(heapq.nlargest(topk, ((key, value) for key, value in counts.items() if value > threshold),
+                                                 key=itemgetter(1)))
+        else:
+            measure_result = {key: value for key, value in counts.items() if value > threshold}
 
         return measure_result
@@ -4,14 +4,74 @@
 # @Email : yzhan135@kent.edu
 # @File : vqe.py
 
+import collections
+import contextlib
+import functools
+
 import numpy as np
 from qiskit.circuit.library import EfficientSU2
 from scipy.optimize import minimize
 from qiskit_ibm_runtime import Session
 from qiskit_ibm_runtime import EstimatorV2 as Estimator
-from qiskit.primitives import Sampler
+from qiskit.primitives import Sampler, StatevectorEstimator
 from qiskit.transpiler.preset_passmanagers import generate_preset_pass_manager
 
+try:
+    from qiskit_aer.primitives import EstimatorV2 as AerEstimator
+except ImportError:  # qiskit-aer is optional; pre-optimization then uses the exact statevector
+    AerEstimator = None
+
+MPS_BOND_DIM = 16              # Bond dimension of the matrix product state used for classical pre-optimization
+STATEVECTOR_MAX_QUBITS = 24    # Without qiskit-aer, pre-optimization is skipped above this size
+
+
+def _adaptive_shot_count(energy, energy_std, shots, shots_min, shots_max, precision):
+    # Target standard error relative to the energy scale; no relative target exists at E = 0
+    target_std = precision * abs(energy)
+    if target_std == 0:
+        return shots_max
+    return int(np.clip(np.ceil(shots * (energy_std / target_std) ** 2), shots_min, shots_max))
+
+
+def adaptive_shots(shots_min=100, shots_max=4000, precision=0.01):
+    """
+        Returns a shot schedule for VQE(shot_schedule=...). Since the standard error of the
+        estimated energy falls as 1/sqrt(shots), the next evaluation gets the number of shots
+        that would bring the last observed standard error down to `precision` times |energy|
+        (a relative target, as the folding energies are of order 1e4), clipped to
+        [shots_min, shots_max]: cheap evaluations while the estimate is already precise enough,
+        more shots only where the noise is large. The schedule is picklable, so it can be
+        handed to worker processes.
+
+        Returns:
+        - schedule: Callable (energy, energy_std, shots) -> shots for the next evaluation.
+    """
+    return functools.partial(_adaptive_shot_count, shots_min=shots_min, shots_max=shots_max, precision=precision)
+
+
+def _classical_estimator(num_qubits):
+    """
+        Returns an estimator that evaluates expectation values classically: qiskit-aer's
+        matrix product state simulator when available, else the exact StatevectorEstimator
+        for circuits of at most STATEVECTOR_MAX_QUBITS qubits; None when neither applies.
+    """
+    if AerEstimator is not None:
+        return AerEstimator(options={"backend_options": {
+            "method": "matrix_product_state",
+            "matrix_product_state_max_bond_dimension": MPS_BOND_DIM,
+        }})
+    if num_qubits <= STATEVECTOR_MAX_QUBITS:
+        return StatevectorEstimator()
+    return None
+
+
+# scipy methods that get the energy and its parameter-shift gradient from one estimator job
+GRADIENT_OPTIMIZERS = ("BFGS", "L-BFGS-B")
+
+
+class _Converged(Exception):
+    """Raised from the cost function to stop the optimizer once the energy has plateaued."""
+
 
 class VQE:
     """
@@ -20,7 +80,9 @@ class VQE:
         ansatz, sets up the optimization process, and computes the minimum eigenvalue
         of a given Hamiltonian using classical-quantum hybrid optimization.
     """
-    def __init__(self, service, hamiltonian, optimization_level=3, shots=200, min_qubit_num=100, maxiter=20):
+    def __init__(self, service, hamiltonian, optimization_level=3, shots=200, min_qubit_num=100, maxiter=20,
+                 ansatz_builder=None, shot_schedule=None, optimizer="cobyla", pre_optimize_maxiter=0,
+                 tol=None, patience=15):
         """
                 Initializes the VQE class with the necessary quantum service, backend, and
                 Hamiltonian information.
@@ -32,16 +94,39 @@ class VQE:
                 - hamiltonian: Pauli terms defining the Hamiltonian.
                 - optimization_level: Integer representing the optimization level for transpiling circuits (default: 3).
                 - shots: Number of shots (repeated measurements) to be performed per circuit execution (default: 1000).
+                - ansatz_builder: Optional callable taking the number of qubits and returning the parametrized
+                  ansatz circuit, e.g. functools.partial(EfficientSU2, entanglement="linear", reps=1).
+                  Fewer parameters and a sparser entanglement mean cheaper iterations (default: EfficientSU2).
+                - shot_schedule: Optional callable (energy, energy_std, shots) -> shots for the next evaluation,
+                  e.g. adaptive_shots(); the first evaluation uses `shots` (default: fixed shots).
+                - optimizer: scipy.optimize.minimize method. For "BFGS" and "L-BFGS-B" the gradient comes
+                  from the parameter-shift rule, so each evaluation runs 2n + 1 circuits for n parameters
+                  (EfficientSU2 has 8 per qubit: about 1,500-1,600 circuits at 92-102 qubits), and
+                  L-BFGS-B is capped at maxiter evaluations, not iterations (default: "cobyla", gradient-free).
+                - pre_optimize_maxiter: COBYLA iterations of a classical pre-optimization on an MPS
+                  (or statevector) simulator, whose result seeds the quantum run (default: 0, disabled).
+                - tol, patience: Stop early once the spread (max - min) of the last `patience` energies is
+                  below `tol` times their mean estimator standard deviation, i.e. once the window is no wider
+                  than the shot noise; about 3.5 for 15 pure-noise samples, so tol=4 is a reasonable choice
+                  (default: tol=None, always run up to maxiter).
         """
         self.service = service
         self.shots = shots
         self.backend = self._select_backend(min_quits=min_qubit_num)
         self.hamiltonian = hamiltonian
-        self.ansatz = EfficientSU2(self.hamiltonian.num_qubits)
+        self.ansatz = (ansatz_builder or EfficientSU2)(self.hamiltonian.num_qubits)
         self.optimization_level = optimization_level
         self.cost_history_dict = {"prev_vector": None, "iters": 0, "cost_history": []}
+        self.best_energy = np.inf
+        self.best_params = None
         self.energy_list = []
         self.maxiter = maxiter
+        self.shot_schedule = shot_schedule
+        self.optimizer = optimizer
+        self.pre_optimize_maxiter = pre_optimize_maxiter
+        self.tol = tol
+        self.recent_energies = collections.deque(maxlen=patience)
+        self.recent_stds = collections.deque(maxlen=patience)
 
     def _select_backend(self, min_quits):
         """
@@ -85,14 +170,89 @@ class VQE:
         result = estimator.run(pubs=[pub]).result()
         energy = result[0].data.evs[0]
 
+        self._record_energy(params, energy, result[0].data.stds[0], estimator)
+
+        return energy
+
+    def energy_and_gradient(self, params, ansatz_isa, hamiltonian_isa, estimator):
+        """
+                Cost function with gradient for the gradient-based optimizers. The energy and its
+                parameter-shift gradient, dE/dθ_k = (E(θ + π/2·e_k) - E(θ - π/2·e_k)) / 2, which is exact for
+                the single-parameter Pauli rotations of the ansatz, are estimated in one estimator job:
+                the 2n + 1 parameter points are sent as one PUB and broadcast against the Hamiltonian.
+
+                Parameters: as for cost_func().
+
+                Returns:
+                - (energy, gradient): The estimated energy and its gradient array for the given parameters.
+        """
+        n = len(params)
+        shifts = np.pi / 2 * np.eye(n)
+        points = np.vstack([params, params + shifts, params - shifts])
+        pub = (ansatz_isa, [hamiltonian_isa], points)
+        result = estimator.run(pubs=[pub]).result()
+        evs = result[0].data.evs
+        energy = evs[0]
+        gradient = (evs[1:n + 1] - evs[n + 1:]) / 2
+
+        self._record_energy(params, energy, result[0].data.stds[0], estimator)
+
+        return energy, gradient
+
+    def _record_energy(self, params, energy, energy_std, estimator):
+        """
+                Record one evaluated energy in the history, keep the lowest energy seen and its
+                parameters, print the progress and, with a shot schedule, set the shots for the
+                next evaluation. With a tolerance set, raises _Converged once the energy window
+                has plateaued.
+        """
+        if self.shot_schedule is not None:
+            estimator.options.default_shots = self.shot_schedule(energy, energy_std, estimator.options.default_shots)
+
         self.energy_list.append(energy)
 
         self.cost_history_dict["iters"] += 1
         self.cost_history_dict["prev_vector"] = params
         self.cost_history_dict["cost_history"].append(energy)
+        if energy < self.best_energy:
+            self.best_energy = energy
+            self.best_params = np.array(params, dtype=float)
         print(f"Iters. done: {self.cost_history_dict['iters']} [Current cost: {energy}]")
 
-        return energy
+        if self.tol is not None:
+            self.recent_energies.append(energy)
+            self.recent_stds.append(energy_std)
+            if (len(self.recent_energies) == self.recent_energies.maxlen
+                    and max(self.recent_energies) - min(self.recent_energies)
+                    < self.tol * np.mean(self.recent_stds)):
+                print(f"Energy plateaued over the last {self.recent_energies.maxlen} iterations, stopping early")
+                raise _Converged
+
+    def pre_optimize(self, x0):
+        """
+                Optimizes the ansatz parameters classically, without quantum jobs, by minimizing the
+                energy of the logical (untranspiled) ansatz on a matrix product state simulator.
+                For Hamiltonians whose low-energy states are well represented at bond dimension
+                MPS_BOND_DIM, the quantum optimization then only has to refine the result.
+
+                Parameters:
+                - x0: Starting parameters.
+
+                Returns:
+                - params: The pre-optimized parameters, or x0 when no classical estimator applies.
+        """
+        estimator = _classical_estimator(self.hamiltonian.num_qubits)
+        if estimator is None:
+            print(f"Skipping classical pre-optimization: {self.hamiltonian.num_qubits} qubits need qiskit-aer")
+            return x0
+
+        def energy(params):
+            pub = (self.ansatz, [self.hamiltonian], [params])
+            return estimator.run(pubs=[pub]).result()[0].data.evs[0]
+
+        res = minimize(energy, x0, method="cobyla", options={'maxiter': self.pre_optimize_maxiter})
+        print(f"Classical pre-optimization done [Energy: {res.fun}]")
+        return res.x
 
     def get_probability_distribution(self, optimized_params) -> 'Dict':
 
@@ -112,14 +272,20 @@ class VQE:
         return measure_result
 
 
-    def run_vqe(self):
+    def run_vqe(self, initial_point=None, session=None):
         """
                 Executes the VQE algorithm. This method:
                 1. Generates the optimized quantum circuit using the pass manager.
                 2. Prepares the Hamiltonian for computation.
-                3. Initializes the optimization process using COBYLA.
+                3. Initializes the optimization process using the configured optimizer (COBYLA by default).
                 4. Returns the result_10_11 of the optimization (minimum eigenvalue of the Hamiltonian).
 
+                Parameters:
+                - initial_point: Optional starting parameters (e.g. converged parameters of a similar
+                  sequence). Ignored unless it matches the ansatz parameter count; random otherwise.
+                - session: Optional open Session on self.backend to run the estimator jobs in, so the caller
+                  can queue further jobs (e.g. the final sampling) in the same session; a new one otherwise.
+
                 Returns:
                 - res: The result_10_11 of the classical optimizer containing the optimized parameters and minimum energy value.
         """
@@ -127,14 +293,34 @@ class VQE:
         ansatz_isa = pm.run(self.ansatz)
         hamiltonian_isa = self.hamiltonian.apply_layout(layout=ansatz_isa.layout)
 
-        x0 = np.random.random(self.ansatz.num_parameters)
+        if initial_point is not None and len(initial_point) == self.ansatz.num_parameters:
+            x0 = np.asarray(initial_point, dtype=float)
+        else:
+            x0 = np.random.random(self.ansatz.num_parameters)
+
+        if self.pre_optimize_maxiter:
+            x0 = self.pre_optimize(x0)
 
-        with Session(backend=self.backend) as session:
+        session_context = Session(backend=self.backend) if session is None else contextlib.nullcontext(session)
+        with session_context as session:
             estimator = Estimator(mode=session)
             estimator.options.default_shots = self.shots
 
-            res = minimize(self.cost_func, x0, args=(ansatz_isa, hamiltonian_isa, estimator), method="cobyla", options={'maxiter': self.maxiter}) #type
+            try:
+                if self.optimizer.upper() in GRADIENT_OPTIMIZERS:
+                    # A line search may evaluate many times per iteration; bound the evaluations too
+                    options = {'maxiter': self.maxiter}
+                    if self.optimizer.upper() == "L-BFGS-B":
+                        options['maxfun'] = self.maxiter
+                    res = minimize(self.energy_and_gradient, x0, args=(ansatz_isa, hamiltonian_isa, estimator), jac=True,
+                                   method=self.optimizer, options=options)
+                else:
+                    res = minimize(self.cost_func, x0, args=(ansatz_isa, hamiltonian_isa, estimator), method=self.optimizer, options={'maxiter': self.maxiter}) #type
+                final_params = res.x
+            except _Converged:
+                # The last trial point may be an exploratory step; return the best one, as res.x would
+                final_params = self.best_params
 
-        # prob_distribution = self.get_probability_distribution(res.x)
+        # prob_distribution = self.get_probability_distribution(final_params)
 
-        return self.energy_list, res.x, self.ansatz
\ No newline at end of file
+        return self.energy_list, final_params, self.ansatz
\ No newline at end of file
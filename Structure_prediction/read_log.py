@@ -33,17 +33,60 @@ Finally, it writes a summary file, one line per pdb_id:
 pdb_id    sequence    seq_length    qubits    top1_energy    cost_max    cost_range
 """
 
+import math
+import mmap
 import os
 import re
+from multiprocessing import Pool
+
+import numpy as np
 
 LOG_FOLDER = "log"  # Folder containing .log and .out files
 OUTPUT_FILE = "log/log_summary.txt"  # Final summary output
+OUTPUT_BUFFER_BYTES = 1 << 20  # Write buffer for the summary file (1 MiB)
 
 # ======================================================
 
+# Every non-cost line of interest, one alternative each, with a single group named after
+# the field it captures. A fragment runs from its "start" line to its "end" line (or to the
+# next fragment / end of file). Line-anchored alternatives allow leading blanks like
+# line.strip() did.
+HEADER_PATTERN = re.compile(
+    rb'^[ \t]*=== Processing protein (?P<start>\S+) ==='
+    rb'|^[ \t]*Residue sequence:[ \t]+(?P<seq>[^\r\n]+)'
+    rb'|^[ \t]*Sequence length:[ \t]+(?P<len>\d+)[ \t]*\r?$'
+    rb'|^[ \t]*Number of qubits:[ \t]+(?P<qubits>\d+)[ \t]*\r?$'
+    rb'|^[ \t]*Top 1 best energy[ \t]*=[ \t]*(?P<top1>[-\d.]+)'
+    rb'|^[ \t]*Finished processing:[ \t]*(?P<end>\S+)',
+    re.MULTILINE,
+)
+COST_PATTERN = re.compile(rb'Current cost:[ \t]*([-\d.]+)')  # "Iters. done: N [Current cost: 14201.49]"
+
+
+def parse_costs(tokens):
+    """
+    Convert the captured 'Current cost' tokens to a float64 array in one NumPy call.
+    Tokens that are not valid numbers are skipped.
+    """
+    try:
+        return np.array(tokens, dtype=np.bytes_).astype(np.float64)
+    except ValueError:
+        costs = []
+        for token in tokens:
+            try:
+                costs.append(float(token))
+            except ValueError:
+                pass
+        return np.array(costs, dtype=np.float64)
+
+
 def parse_log_file(filepath):
     """
     Parse a single .log or .out file, which may contain multiple protein fragments.
+    The file is memory-mapped and read in two regex passes, with no Python code per line:
+    one HEADER_PATTERN.finditer over the whole file yields the few header lines of every
+    fragment (dispatched on m.lastgroup), and one COST_PATTERN.findall per fragment span
+    collects its cost values.
     Return a list of dictionaries, each containing:
       {
         'pdb_id': str,
@@ -51,93 +94,72 @@ def parse_log_file(filepath):
         'seq_length': int,
         'qubits': int,
         'top1_energy': float or None,
-        'cost_values': list of float
+        'cost_max': float (-inf until a cost is seen),
+        'cost_min': float (+inf until a cost is seen)
       }
     """
     results = []
-    current_data = None  # used to accumulate data for current fragment
 
-    with open(filepath, "r", encoding="utf-8") as f:
-        for line in f:
-            line_s = line.strip()
-            if not line_s:
-                continue
+    if os.path.getsize(filepath) == 0:
+        return results
 
-            # Detect start of a new protein fragment
-            # e.g.: === Processing protein 6g3a ===
-            m_start = re.match(r'^=== Processing protein (\S+) ===', line_s)
-            if m_start:
+    # The file object is only needed for its descriptor, so it gets no read buffer of its own
+    with open(filepath, "rb", buffering=0) as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+
+        def finalize(data, span_start, span_end):
+            # Only the max/min of the fragment's costs are kept
+            costs = parse_costs(COST_PATTERN.findall(mm, span_start, span_end))
+            if costs.size:
+                data['cost_max'] = float(costs.max())
+                data['cost_min'] = float(costs.min())
+            results.append(data)
+
+        current_data = None  # fragment being filled
+        span_start = 0       # where its cost lines may begin
+        for m in HEADER_PATTERN.finditer(mm):
+            kind = m.lastgroup
+            value = m.group(kind)
+
+            # Start of a new protein fragment: "=== Processing protein 6g3a ==="
+            if kind == "start":
                 # If we already had a current_data for previous protein, finalize it
                 if current_data:
-                    results.append(current_data)
-                pdb_id = m_start.group(1)
+                    finalize(current_data, span_start, m.start())
                 current_data = {
-                    'pdb_id': pdb_id,
+                    'pdb_id': value.decode("utf-8"),
                     'sequence': "",
                     'seq_length': None,
                     'qubits': None,
                     'top1_energy': None,
-                    'cost_values': []
+                    'cost_max': -math.inf,
+                    'cost_min': math.inf
                 }
+                span_start = m.end()
                 continue
 
-            # Residue sequence line: "Residue sequence: KIGEGVFGEVFQ"
-            m_seq = re.match(r'^Residue sequence:\s+(.+)$', line_s)
-            if m_seq and current_data:
-                current_data['sequence'] = m_seq.group(1).strip()
+            if not current_data:
                 continue
 
-            # Sequence length line: "Sequence length: 12"
-            m_len = re.match(r'^Sequence length:\s+(\d+)$', line_s)
-            if m_len and current_data:
-                current_data['seq_length'] = int(m_len.group(1))
-                continue
-
-            # Number of qubits line: "Number of qubits: 82"
-            m_qubits = re.match(r'^Number of qubits:\s+(\d+)$', line_s)
-            if m_qubits and current_data:
-                current_data['qubits'] = int(m_qubits.group(1))
-                continue
-
-            # Current cost lines: "Iters. done: N [Current cost: 14201.49]"
-            # We'll store these cost values
-            m_cost = re.search(r'Current cost:\s*([\-\d\.]+)', line_s)
-            if m_cost and current_data:
+            if kind == "seq":
+                current_data['sequence'] = value.strip().decode("utf-8")
+            elif kind == "len":
+                current_data['seq_length'] = int(value)
+            elif kind == "qubits":
+                current_data['qubits'] = int(value)
+            elif kind == "top1":
                 try:
-                    val = float(m_cost.group(1))
-                    current_data['cost_values'].append(val)
+                    current_data['top1_energy'] = float(value)
                 except ValueError:
                     pass
-                continue
+            elif kind == "end":
+                # "Finished processing: 6g3a" ends the block; a mismatching
+                # pdb_id (badly structured file) finalizes it anyway
+                finalize(current_data, span_start, m.start())
+                current_data = None
 
-            # Top 1 best energy line: "Top 1 best energy = 164.81302034505325, xyz saved: 6ugp_top_1.xyz"
-            m_top1 = re.match(r'^Top 1 best energy\s*=\s*([\-\d\.]+)', line_s)
-            if m_top1 and current_data:
-                try:
-                    top1_val = float(m_top1.group(1))
-                    current_data['top1_energy'] = top1_val
-                except ValueError:
-                    pass
-                continue
-
-            # Finished processing line: "Finished processing: 6g3a"
-            # This indicates the end of a protein block
-            m_end = re.match(r'^Finished processing:\s*(\S+)', line_s)
-            if m_end and current_data:
-                # If there's a mismatch, assume it's the correct end
-                if m_end.group(1) == current_data['pdb_id']:
-                    # finalize
-                    results.append(current_data)
-                    current_data = None
-                else:
-                    # If the file is not well-structured, we still finalize anyway
-                    results.append(current_data)
-                    current_data = None
-                continue
-
-    # If file ended but we still have a current_data
-    if current_data:
-        results.append(current_data)
+        # If file ended but we still have a current_data
+        if current_data:
+            finalize(current_data, span_start, len(mm))
 
     return results
 
@@ -147,21 +169,23 @@ def main():
     summary_dict = {}
 
     # Traverse .log or .out files in LOG_FOLDER
-    for fname in os.listdir(LOG_FOLDER):
-        if not (fname.endswith(".log") or fname.endswith(".out")):
-            continue
-        filepath = os.path.join(LOG_FOLDER, fname)
-        fragments = parse_log_file(filepath)
-        # Merge them into summary_dict
-        for frag in fragments:
-            pdb_id = frag['pdb_id']
-            if pdb_id not in summary_dict:
-                summary_dict[pdb_id] = frag
-            else:
-                # If the same pdb_id appears multiple times, decide how to handle conflict
-                # For simplicity, we can overwrite or unify data. We'll do an overwrite if needed.
-                # You may also want to check if e.g. cost_values are bigger, etc.
-                summary_dict[pdb_id] = frag
+    filepaths = [os.path.join(LOG_FOLDER, fname) for fname in os.listdir(LOG_FOLDER)
+                 if fname.endswith((".log", ".out"))]
+
+    # Files are parsed in parallel; imap keeps the listing order, so a pdb_id
+    # found in several files is still resolved as in a sequential scan
+    with Pool(os.cpu_count()) as pool:
+        for fragments in pool.imap(parse_log_file, filepaths, chunksize=4):
+            # Merge them into summary_dict
+            for frag in fragments:
+                pdb_id = frag['pdb_id']
+                if pdb_id not in summary_dict:
+                    summary_dict[pdb_id] = frag
+                else:
+                    # If the same pdb_id appears multiple times, decide how to handle conflict
+                    # For simplicity, we can overwrite or unify data. We'll do an overwrite if needed.
+                    # You may also want to check if e.g. cost_max is bigger, etc.
+                    summary_dict[pdb_id] = frag
 
     # Now we build the final results
     # For each pdb_id, we want: pdb_id, residue_seq, seq_length, qubits, top1_best_energy, cost_max, cost_range
@@ -172,10 +196,9 @@ def main():
         seq_len = data['seq_length']
         qubits = data['qubits']
         top1 = data['top1_energy']
-        cost_vals = data['cost_values']
-        if cost_vals:
-            cost_max = max(cost_vals)
-            cost_min = min(cost_vals)
+        cost_max = data['cost_max']
+        cost_min = data['cost_min']
+        if cost_min <= cost_max:  # at least one cost value was seen
             cost_range = cost_max - cost_min
         else:
             cost_max = None
@@ -185,20 +208,20 @@ def main():
     # Sort final records by pdb_id
     final_records.sort(key=lambda x: x[0])
 
-    # Write output
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as out_f:
-        # header
-        out_f.write(
-            "pdb_id\tResidue_sequence\tSequence_length\tNumber_of_qubits\tTop1_best_energy\tCost_max\tCost_range\n")
-        for (pdb_id, seq, seq_len, qubits, top1, cost_max, cost_range) in final_records:
-            # Convert None to empty or something
-            seq_len_str = str(seq_len) if seq_len is not None else ""
-            qubits_str = str(qubits) if qubits is not None else ""
-            top1_str = f"{top1:.6f}" if top1 is not None else ""
-            cost_max_str = f"{cost_max:.6f}" if cost_max is not None else ""
-            cost_range_str = f"{cost_range:.6f}" if cost_range is not None else ""
-            out_line = f"{pdb_id}\t{seq}\t{seq_len_str}\t{qubits_str}\t{top1_str}\t{cost_max_str}\t{cost_range_str}\n"
-            out_f.write(out_line)
+    # Build the output lines, then write them in one call
+    # header
+    out_lines = ["pdb_id\tResidue_sequence\tSequence_length\tNumber_of_qubits\tTop1_best_energy\tCost_max\tCost_range"]
+    for (pdb_id, seq, seq_len, qubits, top1, cost_max, cost_range) in final_records:
+        # Convert None to empty or something
+        seq_len_str = str(seq_len) if seq_len is not None else ""
+        qubits_str = str(qubits) if qubits is not None else ""
+        top1_str = f"{top1:.6f}" if top1 is not None else ""
+        cost_max_str = f"{cost_max:.6f}" if cost_max is not None else ""
+        cost_range_str = f"{cost_range:.6f}" if cost_range is not None else ""
+        out_lines.append(f"{pdb_id}\t{seq}\t{seq_len_str}\t{qubits_str}\t{top1_str}\t{cost_max_str}\t{cost_range_str}")
+
+    with open(OUTPUT_FILE, "w", encoding="utf-8", buffering=OUTPUT_BUFFER_BYTES) as out_f:
+        out_f.write("\n".join(out_lines) + "\n")
 
     print(f"Done! Processed {len(final_records)} proteins. Summary written to {OUTPUT_FILE}.")
 
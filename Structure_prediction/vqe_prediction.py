@@ -4,19 +4,42 @@
 # @Email : yzhan135@kent.edu
 # @File : vqe_prediction.py
 
+import collections
+import contextlib
+import csv
+import io
+import multiprocessing
 import os
+import pickle
 import shutil
 import time
+import traceback
 
+import numpy as np
+import pandas as pd
 from Protein_Folding import Peptide
 from Protein_Folding.interactions.miyazawa_jernigan_interaction import MiyazawaJerniganInteraction
 from Protein_Folding.penalty_parameters import PenaltyParameters
 from Protein_Folding.protein_folding_problem import ProteinFoldingProblem
-from qiskit_ibm_runtime import QiskitRuntimeService
+from qiskit_ibm_runtime import QiskitRuntimeService, Session
 
-from Qiskit_VQE import VQE
+from Qiskit_VQE import VQE, adaptive_shots
 from Qiskit_VQE import StateCalculator
 
+# Mapping from three-letter codes to one-letter codes
+THREE_TO_ONE = {
+    'ALA': 'A', 'ARG': 'R', 'ASN': 'N', 'ASP': 'D', 'CYS': 'C',
+    'GLN': 'Q', 'GLU': 'E', 'GLY': 'G', 'HIS': 'H', 'ILE': 'I',
+    'LEU': 'L', 'LYS': 'K', 'MET': 'M', 'PHE': 'F', 'PRO': 'P',
+    'SER': 'S', 'THR': 'T', 'TRP': 'W', 'TYR': 'Y', 'VAL': 'V'
+}
+
+# Folder of pickled (problem, Hamiltonian) pairs, one per sequence (None to disable);
+# delete it after changing the interaction or penalty parameters in _build_problem
+HAMILTONIAN_CACHE_DIR = "result/hamiltonians"
+
+_service = None  # Per-worker QiskitRuntimeService, set by _init_worker
+
 def read_config(file_path):
     """
     Read the config file (INSTANCE=xxx / TOKEN=xxx)
@@ -50,57 +73,36 @@ def parse_txt_file(txt_file_path):
       ...
     ]
     """
-    # Mapping from three-letter codes to one-letter codes
-    three_to_one = {
-        'ALA': 'A', 'ARG': 'R', 'ASN': 'N', 'ASP': 'D', 'CYS': 'C',
-        'GLN': 'Q', 'GLU': 'E', 'GLY': 'G', 'HIS': 'H', 'ILE': 'I',
-        'LEU': 'L', 'LYS': 'K', 'MET': 'M', 'PHE': 'F', 'PRO': 'P',
-        'SER': 'S', 'THR': 'T', 'TRP': 'W', 'TYR': 'Y', 'VAL': 'V'
-    }
-
-    fragments = []
-    with open(txt_file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-
-            # Assumes tab-separated docking_workspace. Adjust if your docking_workspace uses spaces or other delimiters
-            parts = line.split('\t')
-            if len(parts) < 5:
-                continue
-
-            pdb_id = parts[0]
-            pocket_file = parts[1]
-            chain_info = parts[2]          # e.g. "Chain A"
-            residue_info = parts[3]        # e.g. "Residues 192-203"
-            seq_info_3letter = parts[4]    # e.g. "VAL-VAL-TYR-PRO-..."
-
-            # Parse chain
-            chain = chain_info.replace("Chain", "").strip()
-            # Parse residue range
-            residues_range = residue_info.replace("Residues", "").strip()
-
-            # Convert three-letter codes to one-letter codes
-            three_letter_codes = seq_info_3letter.split('-')
-            single_letter_codes = []
-            for code_3letter in three_letter_codes:
-                code_3letter = code_3letter.strip().upper()
-                if code_3letter in three_to_one:
-                    single_letter_codes.append(three_to_one[code_3letter])
-                else:
-                    raise ValueError(f"Unknown residue code: {code_3letter}")
-
-            seq_info_1letter = "".join(single_letter_codes)
-
-            fragments.append({
-                'pdb_id': pdb_id,
-                'pocket_file': pocket_file,
-                'chain': chain,
-                'residues_range': residues_range,
-                'sequence': seq_info_1letter
-            })
-    return fragments
+    # Assumes tab-separated docking_workspace. Adjust if your docking_workspace uses spaces or other delimiters;
+    # lines with fewer than 5 fields are skipped, extra fields are ignored
+    df = pd.read_csv(
+        txt_file_path,
+        sep="\t",
+        header=None,
+        names=["pdb_id", "pocket_file", "chain_info", "residue_info", "seq_info_3letter"],
+        usecols=range(5),
+        dtype=str,
+        quoting=csv.QUOTE_NONE,
+        encoding="utf-8",
+        engine="c",
+    ).dropna().reset_index(drop=True)
+    # e.g. "Chain A", "Residues 192-203", "VAL-VAL-TYR-PRO-..."
+
+    df["pdb_id"] = df["pdb_id"].str.strip()
+    # Parse chain
+    df["chain"] = df["chain_info"].str.replace("Chain", "").str.strip()
+    # Parse residue range
+    df["residues_range"] = df["residue_info"].str.replace("Residues", "").str.strip()
+
+    # Convert three-letter codes to one-letter codes: one row per residue, mapped in one call
+    codes = df["seq_info_3letter"].str.upper().str.split("-").explode().str.strip()
+    single_letter_codes = codes.map(THREE_TO_ONE)
+    unknown = single_letter_codes.isna()
+    if unknown.any():
+        raise ValueError(f"Unknown residue code: {codes[unknown].iloc[0]}")
+    df["sequence"] = single_letter_codes.groupby(level=0).agg("".join)
+
+    return df[["pdb_id", "pocket_file", "chain", "residues_range", "sequence"]].to_dict("records")
 
 
 def pick_unique_fragments(fragments, max_count=25):
@@ -118,16 +120,20 @@ def pick_unique_fragments(fragments, max_count=25):
     return selected
 
 
-def run_vqe_for_fragment(frag, service, max_iter=150):
+def _build_problem(main_chain_sequence):
     """
-    Use VQE to predict the protein structure corresponding to the given fragment
+    Build the ProteinFoldingProblem and its qubit Hamiltonian for a main-chain sequence.
+    The pair is pickled to HAMILTONIAN_CACHE_DIR/{sequence}.pkl, so later runs (and other
+    workers) load it instead of repeating the Pauli operator construction. The pickled
+    problem keeps the unused qubits recorded by qubit_op(), which interpret() needs.
+    Returns (protein_folding_problem, hamiltonian).
     """
-    main_chain_sequence = frag['sequence']
-    protein_id = frag['pdb_id']
-
-    print(f"\n=== Processing protein {protein_id} ===")
-    print(f"Residue sequence: {main_chain_sequence}")
-    print(f"Sequence length: {len(main_chain_sequence)}")
+    cache_path = None
+    if HAMILTONIAN_CACHE_DIR is not None:
+        cache_path = os.path.join(HAMILTONIAN_CACHE_DIR, f"{main_chain_sequence}.pkl")
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
 
     # 1. Construct the protein object (only main chain here, no side chains)
     side_chain_seq = ['' for _ in range(len(main_chain_sequence))]
@@ -141,8 +147,43 @@ def run_vqe_for_fragment(frag, service, max_iter=150):
     protein_folding_problem = ProteinFoldingProblem(peptide, mj_interaction, penalty_terms)
     hamiltonian = protein_folding_problem.qubit_op()
 
-    # Here, according to your needs, add 5 extra qubits (instead of the original +2 approach)
-    qubits_num = hamiltonian.num_qubits + 5
+    if cache_path is not None:
+        # Written under a temporary name and renamed, so a reader never sees a partial file
+        os.makedirs(HAMILTONIAN_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((protein_folding_problem, hamiltonian), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    return protein_folding_problem, hamiltonian
+
+
+def run_vqe_for_fragment(frag, service, max_iter=150, extra_qubits=5, ansatz_builder=None, initial_point=None,
+                         shot_schedule=None, optimizer="cobyla", pre_optimize_maxiter=0, tol=None, patience=15):
+    """
+    Use VQE to predict the protein structure corresponding to the given fragment.
+    extra_qubits only raises the minimum backend size asked for (the ansatz always acts on
+    the Hamiltonian's qubits); ansatz_builder is passed on to VQE to replace EfficientSU2.
+    initial_point warm-starts the optimizer (random start when None); shot_schedule adapts the
+    estimator shots between evaluations (e.g. adaptive_shots(), fixed shots when None);
+    optimizer is the scipy method ("BFGS"/"L-BFGS-B" use parameter-shift gradients, 2n + 1 circuits
+    per evaluation for n parameters);
+    pre_optimize_maxiter > 0 first optimizes the parameters classically on an MPS simulator;
+    with tol set, VQE stops once the last `patience` energies lie within tol estimator standard
+    deviations of each other.
+    Returns (optimized ansatz parameters, number of energy evaluations used).
+    """
+    main_chain_sequence = frag['sequence']
+    protein_id = frag['pdb_id']
+
+    print(f"\n=== Processing protein {protein_id} ===")
+    print(f"Residue sequence: {main_chain_sequence}")
+    print(f"Sequence length: {len(main_chain_sequence)}")
+
+    # 1-3. Build the protein folding problem and its Hamiltonian (cached on disk per sequence)
+    protein_folding_problem, hamiltonian = _build_problem(main_chain_sequence)
+
+    # Here, according to your needs, add extra qubits (5 by default, instead of the original +2 approach)
+    qubits_num = hamiltonian.num_qubits + extra_qubits
     print(f"Number of qubits: {qubits_num}")
 
     # 4. Call VQE
@@ -150,27 +191,37 @@ def run_vqe_for_fragment(frag, service, max_iter=150):
         service=service,
         hamiltonian=hamiltonian,
         min_qubit_num=qubits_num,
-        maxiter=max_iter
+        maxiter=max_iter,
+        ansatz_builder=ansatz_builder,
+        shot_schedule=shot_schedule,
+        optimizer=optimizer,
+        pre_optimize_maxiter=pre_optimize_maxiter,
+        tol=tol,
+        patience=patience
     )
 
-    # run_vqe() returns (energy_list, best_solution, ansatz, top_results)
-    energy_list, final_solution, ansatz, top_results = vqe_instance.run_vqe()
+    # Run the VQE loop and the final sampling job in one Session on the VQE backend,
+    # so the sampling job does not queue on its own
+    with Session(backend=vqe_instance.backend) as session:
+        # run_vqe() returns (energy_list, best_solution, ansatz)
+        energy_list, final_solution, ansatz = vqe_instance.run_vqe(initial_point=initial_point, session=session)
 
-    # 5. Post-processing and saving fig
-    # Set output directory: one folder per pdb_id
-    output_dir = f"result/{protein_id}"
-    os.makedirs(output_dir, exist_ok=True)
+        # 5. Post-processing and saving fig
+        # Set output directory: one folder per pdb_id
+        output_dir = f"result/{protein_id}"
+        os.makedirs(output_dir, exist_ok=True)
 
-    # Save the entire iteration energy list
-    energy_list_file = os.path.join(output_dir, f"energy_list_{protein_id}.txt")
-    with open(energy_list_file, 'w') as file:
-        for item in energy_list:
-            file.write(str(item) + '\n')
-    print(f"Energy list saved to: {energy_list_file}")
+        # Save the entire iteration energy list
+        energy_list_file = os.path.join(output_dir, f"energy_list_{protein_id}.txt")
+        with open(energy_list_file, 'w') as file:
+            file.write("".join(f"{item}\n" for item in energy_list))
+        print(f"Energy list saved to: {energy_list_file}")
+
+        # Compute the probability distribution of the final_solution and interpret it into 3D coordinates
+        state_calculator = StateCalculator(service, qubits_num, ansatz, backend=vqe_instance.backend, mode=session)
+        # interpret() only uses the most probable bitstring, so the top 64 are plenty
+        final_prob_dist = state_calculator.get_probability_distribution(final_solution, topk=64)
 
-    # Compute the probability distribution of the final_solution and interpret it into 3D coordinates
-    state_calculator = StateCalculator(service, qubits_num, ansatz)
-    final_prob_dist = state_calculator.get_probability_distribution(final_solution)
     protein_result = protein_folding_problem.interpret(final_prob_dist)
 
     # Save the final structure as .xyz
@@ -178,6 +229,116 @@ def run_vqe_for_fragment(frag, service, max_iter=150):
     print(f"Protein structure saved at: {output_dir}/{protein_id}.xyz")
 
     print(f"Finished processing: {protein_id}\n")
+    return final_solution, len(energy_list)
+
+
+def copy_fragment_results(source_id, target_id):
+    """
+    Copy the energy list and .xyz structure saved for source_id into result/{target_id},
+    renamed for target_id (used for fragments whose sequence was already run).
+    """
+    source_dir, target_dir = f"result/{source_id}", f"result/{target_id}"
+    os.makedirs(target_dir, exist_ok=True)
+    shutil.copyfile(os.path.join(source_dir, f"energy_list_{source_id}.txt"),
+                    os.path.join(target_dir, f"energy_list_{target_id}.txt"))
+    shutil.copyfile(os.path.join(source_dir, f"{source_id}.xyz"), os.path.join(target_dir, f"{target_id}.xyz"))
+
+
+def load_param_bank(bank_path):
+    """
+    Load the {sequence: optimized parameters} bank saved by earlier runs.
+    Returns an empty dict when bank_path is None or the file does not exist yet.
+    """
+    if bank_path is None or not os.path.exists(bank_path):
+        return {}
+    with np.load(bank_path) as bank:
+        return {seq: bank[seq] for seq in bank.files}
+
+
+def save_param_bank(bank_path, param_bank):
+    """
+    Save the {sequence: optimized parameters} bank as an .npz file (no-op when bank_path is None).
+    Written under a temporary name and renamed, so an interrupted save keeps the previous bank.
+    """
+    if bank_path is None:
+        return
+    os.makedirs(os.path.dirname(bank_path) or ".", exist_ok=True)
+    tmp_path = f"{bank_path}.tmp.npz"
+    np.savez(tmp_path, **param_bank)
+    os.replace(tmp_path, bank_path)
+
+
+def warm_start_order(fragments):
+    """
+    Order fragments so that the first fragment of every sequence length comes first, then the
+    second of every length, and so on. Run in waves, each wave then mostly holds lengths not
+    yet solved, and the later fragments of a length can warm-start from the earlier ones.
+    Returns a list of (fragment number, fragment), numbered by the original order.
+    """
+    seen_per_length = collections.Counter()
+    ranked = []
+    for idx, fragment in enumerate(fragments, start=1):
+        length = len(fragment['sequence'])
+        ranked.append((seen_per_length[length], idx, fragment))
+        seen_per_length[length] += 1
+    ranked.sort(key=lambda item: item[:2])
+    return [(idx, fragment) for _, idx, fragment in ranked]
+
+
+def closest_params(param_bank, sequence):
+    """
+    Return the stored parameters of the most similar sequence of the same length
+    (highest number of identical positions), or None when there is none.
+    Equal length gives the same Hamiltonian size and hence the same parameter count.
+    """
+    best_params, best_identity = None, -1
+    for seq, params in param_bank.items():
+        if len(seq) != len(sequence):
+            continue
+        identity = sum(a == b for a, b in zip(seq, sequence))
+        if identity > best_identity:
+            best_params, best_identity = params, identity
+    return best_params
+
+
+def _init_worker(instance, token):
+    """
+    Pool initializer: each worker process opens its own QiskitRuntimeService once,
+    since the service object cannot be pickled and sent to the workers.
+    """
+    global _service
+    _service = QiskitRuntimeService(
+        channel='ibm_quantum',
+        instance=instance,
+        token=token
+    )
+
+
+def _run_fragment_job(job):
+    """
+    Run one fragment in a worker process. Its printed output is captured and returned
+    as one block, so the fragments' logs are not interleaved on stdout.
+    An exception is caught here rather than raised through imap, which would terminate the
+    pool and with it the other fragments; the traceback is appended to the output instead.
+    Returns (protein_id, sequence, elapsed_seconds, iterations, output_text, final_solution),
+    with iterations and final_solution None if the fragment failed.
+    """
+    idx, total, fragment, initial_point, vqe_options = job
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        print(f"\n--- Fragment {idx}/{total}: PDB={fragment['pdb_id']} ---")
+
+        start_time = time.time()
+        try:
+            final_solution, iterations = run_vqe_for_fragment(fragment, _service, initial_point=initial_point,
+                                                              **vqe_options)
+        except Exception:
+            print(f"Fragment {fragment['pdb_id']} failed:\n{traceback.format_exc()}", end="")
+            final_solution, iterations = None, None
+        end_time = time.time()
+
+    return (fragment['pdb_id'], fragment['sequence'], end_time - start_time, iterations, buffer.getvalue(),
+            final_solution)
 
 
 def main():
@@ -186,44 +347,80 @@ def main():
     config_path = "config.txt"  # IBM Quantum config file
     max_fragments = 22                   # Maximum number of fragments
     max_iter = 200                       # Maximum VQE iterations
+    max_workers = 4                      # Fragments run in parallel, each with its own runtime Session
+    shot_schedule = adaptive_shots(shots_min=100, shots_max=4000, precision=0.01)  # Std target of 1% of |E|; None for fixed shots
+    optimizer = "cobyla"                 # scipy method; "L-BFGS-B" is opt-in: 2n + 1 circuits per evaluation
+    pre_optimize_maxiter = 300           # Classical MPS pre-optimization iterations before the quantum run (0 to disable)
+    # Stop VQE early once the last stop_patience energies lie within stop_tol estimator standard deviations
+    # (None to disable). 15 energies of pure shot noise spread over about 3.5 standard deviations, e.g. 4
+    stop_tol = None
+    stop_patience = 15
+    param_bank_path = "result/param_bank.npz"  # Converged parameters per sequence, reused to warm-start later runs (None to disable)
 
     config = read_config(config_path)
     if not config or "INSTANCE" not in config or "TOKEN" not in config:
         print("Could not read INSTANCE or TOKEN from config. Please check your config file.")
         return
 
-    # Initialize the quantum service
-
-    service = QiskitRuntimeService(
-        channel='ibm_quantum',
-        instance=config["INSTANCE"],
-        token=config["TOKEN"]
-    )
-
     # Read all fragments from TXT
     all_fragments = parse_txt_file(txt_file_path)
 
     # Pick up to max_fragments unique fragments
     selected_fragments = pick_unique_fragments(all_fragments, max_fragments)
-
-    # Run quantum prediction for each fragment
+    # The result depends only on the sequence: run VQE once per sequence and copy it to the other pdb_ids
+    fragments_by_seq = collections.defaultdict(list)
+    for fragment in selected_fragments:
+        fragments_by_seq[fragment['sequence']].append(fragment)
+    unique_fragments = [fragments[0] for fragments in fragments_by_seq.values()]
+    # Warm-start each fragment from the most similar sequence solved so far, in earlier runs
+    # or in earlier waves of this run
+    param_bank = load_param_bank(param_bank_path)
+    vqe_options = {"max_iter": max_iter, "shot_schedule": shot_schedule, "optimizer": optimizer,
+                   "pre_optimize_maxiter": pre_optimize_maxiter, "tol": stop_tol, "patience": stop_patience}
+    ordered_fragments = warm_start_order(unique_fragments)
+    num_workers = max(1, min(max_workers, len(ordered_fragments)))
+
+    # Run quantum prediction for the fragments in a process pool; every worker
+    # initializes its own quantum service once and is reused for the following fragments.
+    # No more workers are started than there are jobs, since each one pays the imports
+    # and the service login. "spawn" avoids forking the network threads of the runtime
+    # client. The fragments go in waves of one job per worker; the bank is updated and
+    # saved after every fragment, so each wave starts from the optima of the previous ones.
+    # imap keeps the order within a wave, so the printed blocks are not interleaved.
     log_file_path = "execution_time_log.txt"
-    with open(log_file_path, 'w') as log_file:
-        log_file.write("Protein_ID\tSequence\tExecution_Time(s)\n")
-
-        for idx, fragment in enumerate(selected_fragments, start=1):
-            protein_id = fragment['pdb_id']
-            seq = fragment['sequence']
-            print(f"\n--- Fragment {idx}/{len(selected_fragments)}: PDB={protein_id} ---")
-
-            start_time = time.time()
-            run_vqe_for_fragment(fragment, service, max_iter=max_iter)
-            end_time = time.time()
-
-            elapsed = end_time - start_time
-            # Record to log
-            log_file.write(f"{protein_id}\t{seq}\t{elapsed:.2f}\n")
-
+    failed = []  # Fragments whose run raised; the others carry on
+    with open(log_file_path, 'w') as log_file, \
+            multiprocessing.get_context("spawn").Pool(
+                num_workers, initializer=_init_worker,
+                initargs=(config["INSTANCE"], config["TOKEN"])) as pool:
+        log_file.write("Protein_ID\tSequence\tExecution_Time(s)\tIterations\n")
+
+        for wave_start in range(0, len(ordered_fragments), num_workers):
+            jobs = [(idx, len(unique_fragments), fragment, closest_params(param_bank, fragment['sequence']),
+                     vqe_options)
+                    for idx, fragment in ordered_fragments[wave_start:wave_start + num_workers]]
+
+            for protein_id, seq, elapsed, iterations, output, final_solution in pool.imap(_run_fragment_job, jobs):
+                print(output, end="")
+                if final_solution is None:
+                    # Keep the other fragments going; nothing to bank or copy to duplicates
+                    failed.append(protein_id)
+                    log_file.write(f"{protein_id}\t{seq}\t{elapsed:.2f}\tFAILED\n")
+                    log_file.flush()
+                    continue
+                # Record to log
+                log_file.write(f"{protein_id}\t{seq}\t{elapsed:.2f}\t{iterations}\n")
+                log_file.flush()
+                param_bank[seq] = final_solution
+                save_param_bank(param_bank_path, param_bank)
+
+                for duplicate in fragments_by_seq[seq][1:]:
+                    copy_fragment_results(protein_id, duplicate['pdb_id'])
+                    print(f"Same sequence as {protein_id}, results copied to: result/{duplicate['pdb_id']}")
+                    log_file.write(f"{duplicate['pdb_id']}\t{seq}\t0.00\t0\n")
+
+    if failed:
+        print(f"\n{len(failed)} fragment(s) failed, see the log above: {', '.join(failed)}")
     print("\nAll processing is complete. Log saved to:", log_file_path)
 
 